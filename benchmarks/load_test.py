@@ -0,0 +1,197 @@
+# benchmarks/load_test.py
+#
+# Multi-user load test of main_app.py. Each simulated user is an AppTest
+# session of the whole app running in its own thread. All sessions share one
+# process, and so the st.cache_data / st.cache_resource stores, the way the
+# sessions of one Streamlit server do. A user opens the app, then keeps
+# switching sidebar page or moving a slider / selectbox on the current page;
+# every interaction (one script rerun) is timed.
+#
+#   python -m benchmarks.load_test --users 1 2 4 8 --interactions 10
+#
+# Per concurrency level it reports interaction latency percentiles,
+# throughput, process CPU and peak RSS, then the highest level whose p95
+# stays under --target-p95. Runs are saved to benchmarks/results/load_*.json
+# so caching changes can be compared under the same load.
+
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import psutil
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.run_benchmarks import REPO_ROOT, RESULTS_DIR, git_commit
+
+APP = os.path.join(REPO_ROOT, "main_app.py")
+PERCENTILES = [50, 90, 95, 99]
+
+
+class ResourceSampler(threading.Thread):
+    """Samples this process's CPU (% of one core) and RSS until stopped."""
+
+    def __init__(self, interval=0.25):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.process = psutil.Process()
+        self.cpu = []
+        self.rss = []
+        self._done = threading.Event()
+
+    def run(self):
+        self.process.cpu_percent(None)
+        while not self._done.wait(self.interval):
+            self.cpu.append(self.process.cpu_percent(None))
+            self.rss.append(self.process.memory_info().rss)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return {
+            "cpu_mean": float(np.mean(self.cpu)) if self.cpu else 0.0,
+            "cpu_max": float(np.max(self.cpu)) if self.cpu else 0.0,
+            "rss_peak_mb": max(self.rss, default=self.process.memory_info().rss) / 2**20
+        }
+
+
+def random_interaction(at, rng):
+    """Pick a page switch, slider move or selectbox change on the current page.
+
+    Returns (kind, label, action); `action()` applies the change and reruns.
+    """
+    choices = []
+    for radio in at.sidebar.radio:
+        choices.append(("page", radio))
+    for slider in at.main.slider:
+        choices.append(("slider", slider))
+    for selectbox in at.main.selectbox:
+        if selectbox.options:
+            choices.append(("selectbox", selectbox))
+    kind, widget = rng.choice(choices)
+
+    if kind == "page":
+        others = [o for o in widget.options if o != widget.value] or list(widget.options)
+        target = rng.choice(others)
+        return kind, target, lambda: widget.set_value(target).run()
+    if kind == "slider":
+        lo, hi, step = widget.min, widget.max, widget.step
+        if isinstance(widget.value, int):
+            target = rng.randrange(int(lo), int(hi) + 1, int(step or 1))
+        else:
+            target = round(lo + step * rng.randint(0, round((hi - lo) / step)), 10)
+        return kind, widget.label, lambda: widget.set_value(target).run()
+    index = rng.randrange(len(widget.options))
+    return kind, widget.label, lambda: widget.select_index(index).run()
+
+def current_page(at):
+    return at.sidebar.radio[0].value if len(at.sidebar.radio) else ""
+
+def run_session(user, interactions, seed, timeout, think, records):
+    """One simulated user: open the app, then `interactions` random reruns, appended to `records`."""
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    for step in range(interactions + 1):
+        kind, label, page, error = "open", "", "", None
+        t = time.perf_counter()
+        try:
+            if step == 0:
+                at.run()
+            else:
+                page = current_page(at)
+                kind, label, action = random_interaction(at, rng)
+                t = time.perf_counter()
+                action()
+            if at.exception:
+                error = at.exception[0].value
+        except Exception as e:  # timeouts and widget errors count as failed interactions
+            error = f"{type(e).__name__}: {e}"
+        records.append({
+            "user": user, "step": step, "kind": kind, "page": page or current_page(at), "label": label,
+            "seconds": time.perf_counter() - t, "error": error
+        })
+        if error and kind == "open":
+            return
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+
+def summarize_level(users, records, wall, resources):
+    steps = [r for r in records if r["kind"] != "open"]
+    opens = [r["seconds"] for r in records if r["kind"] == "open"]
+    latencies = np.array([r["seconds"] for r in steps]) if steps else np.zeros(1)
+    summary = {
+        "users": users,
+        "interactions": len(steps),
+        "errors": sum(1 for r in records if r["error"]),
+        "throughput": len(steps) / wall if wall else 0.0,
+        "open_median": float(np.median(opens)) if opens else 0.0,
+        "max": float(latencies.max()),
+        **{f"p{p}": float(np.percentile(latencies, p)) for p in PERCENTILES},
+        **resources
+    }
+    by_page = {}
+    for r in steps:
+        by_page.setdefault(r["page"], []).append(r["seconds"])
+    summary["page_p95"] = {page: float(np.percentile(v, 95)) for page, v in by_page.items()}
+    return summary
+
+def run_level(users, interactions, seed, timeout, think):
+    records = []
+    sampler = ResourceSampler()
+    sessions = [threading.Thread(target=run_session, args=(u, interactions, seed + u, timeout, think, records))
+                for u in range(users)]
+    sampler.start()
+    t = time.perf_counter()
+    for s in sessions:
+        s.start()
+    for s in sessions:
+        s.join()
+    wall = time.perf_counter() - t
+    return summarize_level(users, records, wall, sampler.stop()), records
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of main_app.py")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8], help="concurrency levels to run")
+    parser.add_argument("--interactions", type=int, default=10, help="interactions per user after opening the app")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between a user's interactions (s)")
+    parser.add_argument("--target-p95", type=float, default=2.0, help="p95 latency a level must stay under (s)")
+    parser.add_argument("--timeout", type=float, default=600, help="per-rerun timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    # Streamlit logs a deprecation warning per element per rerun
+    logging.disable(logging.WARNING)
+
+    levels, all_records = [], []
+    print(f"{'users':>5} {'steps':>6} {'err':>4} {'thru/s':>7} {'open':>7} "
+          + " ".join(f"{'p' + str(p):>7}" for p in PERCENTILES) + f" {'max':>7} {'cpu%':>6} {'rss MB':>7}")
+    for users in args.users:
+        summary, records = run_level(users, args.interactions, args.seed, args.timeout, args.think)
+        levels.append(summary)
+        all_records.extend(dict(r, level=users) for r in records)
+        print(f"{users:>5} {summary['interactions']:>6} {summary['errors']:>4} {summary['throughput']:>7.2f} {summary['open_median']:>7.2f} "
+              + " ".join(f"{summary[f'p{p}']:>7.2f}" for p in PERCENTILES)
+              + f" {summary['max']:>7.2f} {summary['cpu_mean']:>6.0f} {summary['rss_peak_mb']:>7.0f}", flush=True)
+
+    sustained = [s["users"] for s in levels if s["p95"] <= args.target_p95 and not s["errors"]]
+    print(f"\nSlowest pages (p95 at {levels[-1]['users']} users): "
+          + ", ".join(f"{page} {v:.2f}s" for page, v in sorted(levels[-1]["page_p95"].items(), key=lambda kv: -kv[1])[:3]))
+    print(f"Highest level with p95 <= {args.target_p95:.1f}s and no errors: "
+          f"{f'{max(sustained)} concurrent users' if sustained else 'none'} ({psutil.cpu_count()} CPUs)")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"load_{datetime.now():%Y%m%d-%H%M%S}_{git_commit()}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "levels": levels, "records": all_records}, f, indent=2)
+        print(f"Saved {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# benchmarks/run_benchmarks.py
+#
+# Timing suite for the loaders, extractors, the comparison merge and a
+# headless render of every page (Streamlit AppTest), plus scaling curves on
+# x10 / x100 copies of the bundled workbooks and, optionally, on generated
+# workbooks of a given number of countries. Run from the repository root:
+#
+#   python -m benchmarks.run_benchmarks                  # full suite
+#   python -m benchmarks.run_benchmarks --quick          # skip the scaling curves
+#   python -m benchmarks.run_benchmarks --only extract   # names containing "extract"
+#   python -m benchmarks.run_benchmarks --quick --synthetic 150 1500
+#
+# Each run is saved to benchmarks/results/<timestamp>_<commit>.json and its
+# medians are compared with the latest run of a different commit (or
+# --baseline); a benchmark slower by more than --threshold is reported as a
+# regression and the exit code is 1.
+
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.scaling import DATA_DIR, scaled_workbook
+from benchmarks.synthetic import SyntheticSpec, generate
+from modules import compare_sources_module as compare
+from modules import raw_materials_analysis_module as raw_materials
+from modules import supply_demand_module as supply_demand
+from modules.compare_sources_module import CRU_SHEET, SPG_SHEET
+from modules.raw_materials_data_module import BUNDLED_FILE as SPG_FILE
+from modules.rawdata import BUNDLED_FILE as CRU_FILE
+from modules.dataset_view import build_views
+from modules.raw_materials_data_module import load_raw_materials_data
+from modules.rawdata import load_raw_p4_sheets
+from modules.sheet_registry import CRU, SPG
+from modules.trade_matrix import build_trade_matrix
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sidebar pages of main_app.py: module -> label
+PAGES = {
+    "compare_sources_module": "Compare CRU vs S&PG",
+    "supply_demand_module": "P4 Supply&Demand",
+    "raw_materials_data_module": "Raw Materials Data",
+    "raw_materials_analysis_module": "Raw Materials Analytics",
+    "p4_data_module": "N&PG P4 Data",
+    "sql_query_module": "SQL Query",
+    "scenario_module": "Scenarios"
+}
+LOADERS = {
+    "cru": ("modules.rawdata", "load_raw_p4_sheets", CRU_FILE),
+    "spg": ("modules.raw_materials_data_module", "load_raw_materials_data", SPG_FILE)
+}
+SCALES = [10, 100]
+# Medians below this are timer noise and never count as regressions
+MIN_SECONDS = 0.001
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return times
+
+def summarize(times):
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "runs": len(times)
+    }
+
+def cold_load(module, func, path):
+    """Time one load in a fresh interpreter (imports done before the clock starts)."""
+    code = (
+        f"import time; from {module} import {func}; "
+        f"t = time.perf_counter(); {func}({path!r}); print(time.perf_counter() - t)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def render_page(module):
+    script = f"from modules.{module} import show\nshow()\n"
+    # Keep Streamlit's per-element deprecation warnings out of the report
+    logging.disable(logging.WARNING)
+    try:
+        at = AppTest.from_string(script, default_timeout=600).run()
+    finally:
+        logging.disable(logging.NOTSET)
+    if at.exception:
+        raise RuntimeError(f"{module}: {at.exception[0].value}")
+
+
+def loader_cases(repeat):
+    cases = {}
+    for name, (module, func, path) in LOADERS.items():
+        cases[f"load.{name}.cold"] = lambda m=module, f=func, p=path: [cold_load(m, f, p) for _ in range(max(1, repeat // 2))]
+    cases["load.cru.warm"] = lambda: measure(lambda: load_raw_p4_sheets(CRU_FILE), repeat)
+    cases["load.spg.warm"] = lambda: measure(lambda: load_raw_materials_data(SPG_FILE), repeat)
+    return cases
+
+def extractor_cases(cru_sheets, spg_sheets, repeat, prefix=""):
+    """Extractors and the comparison merge over one pair of loaded workbooks."""
+    cru_views = build_views(cru_sheets, CRU)
+    spg_views = build_views(spg_sheets, SPG)
+    cru_view, spg_view = cru_views[CRU_SHEET], spg_views[SPG_SHEET]
+    cru_raw = compare.extract_cru_table(cru_view, 2021)
+    spg_raw = compare.extract_spg_table(spg_view, 2021)
+    years = list(range(2010, 2030))
+
+    def run(fn):
+        return lambda: measure(fn, repeat)
+
+    return {
+        f"{prefix}views.build": run(lambda: (build_views(cru_sheets, CRU), build_views(spg_sheets, SPG))),
+        f"{prefix}extract.supply_demand.level1_regions": run(lambda: supply_demand.extract_level1_regions(cru_views["P4 Capacity"])),
+        f"{prefix}extract.supply_demand.metric_row": run(lambda: supply_demand.extract_metric_row(cru_views["P4 Capacity"], "World Total")),
+        f"{prefix}extract.raw_materials.metric_row": run(lambda: raw_materials.extract_metric_row(spg_views["P4_Cap_O"], "Global")),
+        f"{prefix}extract.compare.cru_table": run(lambda: compare.extract_cru_table(cru_view, 2021)),
+        f"{prefix}extract.compare.spg_table": run(lambda: compare.extract_spg_table(spg_view, 2021)),
+        f"{prefix}extract.compare.country_years": run(lambda: compare.country_year_tables(cru_view, spg_view)),
+        f"{prefix}extract.compare.source_cubes": run(lambda: compare.source_cubes(cru_view, spg_view, years)),
+        f"{prefix}extract.trade_matrix": run(lambda: build_trade_matrix(cru_sheets)),
+        f"{prefix}compare.merge": run(lambda: compare.compare_tables(cru_raw, spg_raw)),
+        f"{prefix}figure.capacity_evolution": run(lambda: supply_demand.evolution_figure(cru_views["P4 Capacity list"]))
+    }
+
+def page_cases(repeat, prefix="", pages=PAGES):
+    return {f"{prefix}page.{module}": lambda m=module: measure(lambda: render_page(m), repeat) for module in pages}
+
+@contextmanager
+def data_files(cru_path, spg_path):
+    """Point the app's default workbooks at other files for the duration of the block.
+
+    Every module resolves its workbooks at call time from P4_CRU_FILE /
+    P4_SPG_FILE (pages, export and report panels, query engine, scenarios),
+    so setting the overrides reaches all of them.
+    """
+    overrides = {"P4_CRU_FILE": cru_path, "P4_SPG_FILE": spg_path}
+    saved = {name: os.environ.get(name) for name in overrides}
+    try:
+        os.environ.update(overrides)
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def scaling_cases(factor, repeat):
+    """Loads, extractors and merge on the x`factor` workbooks.
+
+    Scaled loads take up to minutes, so each is timed once and its result
+    feeds the extractor cases.
+    """
+    cru_path = scaled_workbook(CRU_FILE, CRU, factor)
+    spg_path = scaled_workbook(SPG_FILE, SPG, factor)
+    prefix = f"scale.x{factor}."
+
+    loaded, load_times = {}, {}
+    for name, loader, path in [("cru", load_raw_p4_sheets, cru_path), ("spg", load_raw_materials_data, spg_path)]:
+        t = time.perf_counter()
+        loaded[name] = loader(path)
+        load_times[name] = time.perf_counter() - t
+
+    cases = {prefix + f"load.{name}": lambda t=t: [t] for name, t in load_times.items()}
+    cases.update(extractor_cases(loaded["cru"], loaded["spg"], repeat, prefix))
+    return cases
+
+def synthetic_cases(countries, repeat, page_repeat):
+    """Loads (Excel and Parquet), extractors and page renders on generated workbooks."""
+    out_dir = os.path.join(DATA_DIR, f"synthetic_c{countries}")
+    cru_path = os.path.join(out_dir, "cru_synthetic.xlsx")
+    spg_path = os.path.join(out_dir, "spg_synthetic.xlsx")
+    if not (os.path.exists(cru_path) and os.path.exists(spg_path)):
+        generate(SyntheticSpec(countries=countries), out_dir)
+    prefix = f"synthetic.c{countries}."
+
+    loaded, load_times = {}, {}
+    for name, loader, path in [("cru", load_raw_p4_sheets, cru_path), ("spg", load_raw_materials_data, spg_path)]:
+        t = time.perf_counter()
+        loaded[name] = loader(path)
+        load_times[name] = time.perf_counter() - t
+
+    def read_parquet(folder):
+        return {f: pd.read_parquet(os.path.join(folder, f)) for f in os.listdir(folder)}
+
+    cases = {prefix + f"load.{name}": lambda t=t: [t] for name, t in load_times.items()}
+    for name in ["cru", "spg"]:
+        folder = os.path.join(out_dir, "parquet", name)
+        cases[prefix + f"load.{name}_parquet"] = lambda d=folder: measure(lambda: read_parquet(d), repeat)
+    cases.update(extractor_cases(loaded["cru"], loaded["spg"], repeat, prefix))
+
+    for name, case in page_cases(page_repeat, prefix).items():
+        def with_files(case=case):
+            with data_files(cru_path, spg_path):
+                return case()
+        cases[name] = with_files
+    return cases
+
+def wanted(group, only):
+    """Whether a case group can match --only (skips loading workbooks of other groups)."""
+    if only is None:
+        return True
+    for kind in ("scale", "synthetic"):
+        if only.startswith(kind):
+            return group.startswith(kind) and (group.startswith(only) or only.startswith(group + "."))
+    return True
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def latest_baseline(commit, results_dir=RESULTS_DIR):
+    """Most recent saved benchmark run of a different commit (load-test results are skipped)."""
+    for path in sorted(glob.glob(os.path.join(results_dir, "*.json")), reverse=True):
+        with open(path, encoding="utf-8") as f:
+            run = json.load(f)
+        if "benchmarks" in run and run.get("commit") != commit:
+            return path
+    return None
+
+def compare_runs(current, baseline, threshold):
+    """(name, baseline median, current median, ratio) for every benchmark slower than `threshold`x."""
+    regressions = []
+    for name, stats in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None or max(stats["median"], before["median"]) < MIN_SECONDS:
+            continue
+        ratio = stats["median"] / max(before["median"], 1e-9)
+        if ratio > threshold:
+            regressions.append((name, before["median"], stats["median"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="P4 dashboard benchmark suite")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--page-repeat", type=int, default=2, help="timed runs per page render")
+    parser.add_argument("--scales", type=int, nargs="*", default=SCALES, help="workbook scale factors")
+    parser.add_argument("--quick", action="store_true", help="skip the scaling curves")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[], metavar="COUNTRIES",
+                        help="also benchmark generated workbooks with this many countries")
+    parser.add_argument("--only", help="run benchmarks whose name contains this string")
+    parser.add_argument("--baseline", help="results JSON to compare against (default: latest other commit)")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio flagged as a regression")
+    parser.add_argument("--no-save", action="store_true", help="don't write the results file")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    # Groups are built one at a time so only one scale's workbooks are in memory
+    groups = [
+        ("load", lambda: loader_cases(args.repeat)),
+        ("extract", lambda: extractor_cases(load_raw_p4_sheets(CRU_FILE), load_raw_materials_data(SPG_FILE), args.repeat)),
+        ("page", lambda: page_cases(args.page_repeat))
+    ]
+    if not args.quick:
+        groups += [(f"scale.x{factor}", lambda f=factor: scaling_cases(f, args.repeat)) for factor in [1] + args.scales]
+    groups += [(f"synthetic.c{n}", lambda n=n: synthetic_cases(n, args.repeat, args.page_repeat)) for n in args.synthetic]
+
+    commit = git_commit()
+    run = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "benchmarks": {}
+    }
+    for group, build in groups:
+        if not wanted(group, args.only):
+            continue
+        cases = {name: case for name, case in build().items() if args.only is None or args.only in name}
+        for name, case in cases.items():
+            stats = summarize(case())
+            run["benchmarks"][name] = stats
+            print(f"{name:<54}  median {stats['median'] * 1000:10.2f} ms   min {stats['min'] * 1000:10.2f} ms", flush=True)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}_{commit}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved {path}")
+
+    baseline_path = args.baseline or latest_baseline(commit)
+    if baseline_path is None:
+        print("No baseline run to compare against.")
+        return 0
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare_runs(run, baseline, args.threshold)
+    print(f"Compared with {baseline['commit']} ({os.path.basename(baseline_path)}):")
+    if not regressions:
+        print(f"  no regressions above {args.threshold:.2f}x")
+        return 0
+    for name, before, after, ratio in regressions:
+        print(f"  REGRESSION {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({ratio:.2f}x)")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# benchmarks/scaling.py
+#
+# Scaled copies of the bundled workbooks for the scaling curves. Every
+# registered sheet keeps its title rows and header offset; its data rows are
+# repeated `factor` times, each copy with renamed countries ("China 2",
+# "China 3", ...) so the number of distinct countries grows with the rows.
+# Unregistered sheets are left out, so compare the curve points against the
+# x1 copy rather than against the original file.
+
+import os
+
+import pandas as pd
+
+from modules.sheet_registry import CRU, SPG, plan_for, sheets_for
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+
+# Key column holding the country name, per source
+COUNTRY_COLUMN = {CRU: "Country", SPG: "Geography"}
+
+def _country_position(plan, header):
+    """Index of the country column in the raw (header=None) frame."""
+    name = COUNTRY_COLUMN[plan.source]
+    if plan.key_positions is not None:
+        return plan.key_positions[plan.key_columns.index(name)]
+    return [str(c).strip() for c in header].index(name)
+
+def _rename(value, copy_number):
+    if isinstance(value, str) and value.strip():
+        return f"{value.strip()} {copy_number}"
+    return value
+
+def scale_workbook(src, dst, source, factor):
+    """Write `dst`: the registered sheets of `src` with their data rows repeated `factor` times."""
+    xl = pd.ExcelFile(src)
+    with pd.ExcelWriter(dst, engine="openpyxl") as writer:
+        for sheet in sheets_for(source):
+            if sheet not in xl.sheet_names:
+                continue
+            plan = plan_for(source, sheet)
+            raw = xl.parse(sheet, header=None)
+            top = raw.iloc[:plan.header_row + 1]
+            body = raw.iloc[plan.header_row + 1:]
+            col = raw.columns[_country_position(plan, raw.iloc[plan.header_row])]
+
+            copies = [body]
+            for k in range(2, factor + 1):
+                copy = body.copy()
+                copy[col] = copy[col].map(lambda v: _rename(v, k))
+                copies.append(copy)
+            pd.concat([top] + copies).to_excel(writer, sheet_name=sheet, header=False, index=False)
+    return dst
+
+def scaled_workbook(src, source, factor, data_dir=DATA_DIR):
+    """Path of the x`factor` copy of `src`, written on first use and reused while newer than `src`."""
+    os.makedirs(data_dir, exist_ok=True)
+    name, ext = os.path.splitext(os.path.basename(src))
+    dst = os.path.join(data_dir, f"{name}_x{factor}{ext}")
+    if not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src):
+        tmp = dst + ".tmp" + ext
+        scale_workbook(src, tmp, source, factor)
+        os.replace(tmp, dst)
+    return dst
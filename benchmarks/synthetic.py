@@ -0,0 +1,249 @@
+# benchmarks/synthetic.py
+#
+# Synthetic CRU-layout and S&P Global-layout workbooks, plus Parquet copies
+# of their parsed sheets, for stress-testing the loaders and pages beyond
+# the size of the bundled files:
+#
+#   python -m benchmarks.synthetic --countries 400 --companies 6 --assets 3 --out data/synthetic
+#
+# Sheet names, title rows and header offsets come from the sheet registry
+# (the same plans the loaders use), so the workbooks load through
+# load_raw_p4_sheets / load_raw_materials_data unchanged. Point the app at
+# them with P4_CRU_FILE / P4_SPG_FILE.
+
+import argparse
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from modules.sheet_registry import CRU, SPG, plan_for, sheets_for
+from modules.trade_matrix import TRADE_SHEETS, TOTAL_COLUMN
+
+# Macro regions as named in each source (the pages filter on these)
+CRU_REGIONS = ["Europe & CIS", "Africa", "North America", "Central & South America", "Asia", "Oceania"]
+SPG_REGIONS = ["Europe", "Eurasia", "Africa", "Middle East", "Asia", "Oceania", "Americas"]
+SUB_REGIONS = 3
+
+SOURCE_SLUGS = {CRU: "cru", SPG: "spg"}
+STATUSES = ["Operating", "Operating", "Operating", "Idle", "Closed"]
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    countries: int = 150
+    companies_per_country: int = 4
+    assets_per_company: int = 2
+    # Widen the registered year spans (they cannot be narrowed: the loaders validate them)
+    first_year: int = None
+    last_year: int = None
+    # Exporter columns of the trade sheets
+    exporters: int = 20
+    seed: int = 0
+
+
+def _years(spec, source, sheet):
+    registered = [int(c) for c in plan_for(source, sheet).year_columns]
+    first, last = registered[0], registered[-1]
+    if spec.first_year is not None:
+        first = min(first, spec.first_year)
+    if spec.last_year is not None:
+        last = max(last, spec.last_year)
+    return list(range(first, last + 1))
+
+def _geography(spec, regions):
+    """(region, sub-region, country) per synthetic country, round-robin over the regions."""
+    rows = []
+    for i in range(spec.countries):
+        region = regions[i % len(regions)]
+        sub_region = f"{region} {i // len(regions) % SUB_REGIONS + 1}"
+        rows.append((region, sub_region, f"Country {i + 1:04d}"))
+    return rows
+
+def _assets(spec, geography, years, rng):
+    """Asset table (country, company, site, status) and its asset x year capacity."""
+    n_assets = spec.countries * spec.companies_per_country * spec.assets_per_company
+    countries = np.repeat([c for _, _, c in geography], spec.companies_per_country * spec.assets_per_company)
+    companies = [f"{country} Company {k // spec.assets_per_company + 1}"
+                 for country, k in zip(countries, np.tile(np.arange(spec.companies_per_country * spec.assets_per_company), spec.countries))]
+    sites = [f"{company} Site {k + 1}" for company, k in zip(companies, np.tile(np.arange(spec.assets_per_company), n_assets // spec.assets_per_company))]
+    statuses = rng.choice(STATUSES, n_assets)
+
+    # Nameplate capacity ramps in at a start year and drops to 0 after closure
+    nameplate = np.round(rng.lognormal(3.0, 0.8, n_assets), 1)
+    start = rng.integers(years[0] - 20, years[-1], n_assets)
+    end = np.where(statuses == "Closed", rng.integers(years[0], years[-1] + 1, n_assets), years[-1] + 1)
+    grid = np.array(years)[None, :]
+    capacity = np.where((grid >= start[:, None]) & (grid < end[:, None]), nameplate[:, None], 0.0)
+
+    assets = pd.DataFrame({"Country": countries, "Company": companies, "Site": sites, "Status": statuses})
+    return assets, capacity
+
+def _balances(capacity_by_country, rng):
+    """Production, demand, imports and exports consistent with country capacity."""
+    utilization = rng.uniform(0.55, 0.95, capacity_by_country.shape)
+    production = np.round(capacity_by_country * utilization, 1)
+    demand = np.round(production * rng.uniform(0.3, 1.7, (capacity_by_country.shape[0], 1)) + rng.uniform(0, 5, capacity_by_country.shape), 1)
+    exports = np.clip(production - demand, 0, None)
+    imports = np.clip(demand - production, 0, None)
+    return {"Capacity": capacity_by_country, "Production": production, "Demand": demand, "Exports": exports, "Imports": imports}
+
+
+def _grid(title_rows, header, rows):
+    """Raw sheet cells: title rows, the header row, then the data rows (all the same width)."""
+    width = len(header)
+    padded = [list(r) + [None] * (width - len(r)) for r in title_rows]
+    return pd.DataFrame(padded + [list(header)] + [list(r) for r in rows])
+
+def _subtotal_rows(geography, values):
+    """CRU S&D row order: World Total, then per region and sub-region their Total rows and countries."""
+    rows = [("World Total",) * 3 + tuple(values.sum(axis=0))]
+    frame = pd.DataFrame(geography, columns=["Region", "Sub-region", "Country"])
+    for region, in_region in frame.groupby("Region", sort=False):
+        rows.append((f"{region} Total",) * 3 + tuple(values[in_region.index].sum(axis=0)))
+        for sub_region, in_sub in in_region.groupby("Sub-region", sort=False):
+            rows.append((f"{sub_region} Total",) * 3 + tuple(values[in_sub.index].sum(axis=0)))
+            rows.extend((region, sub_region, country) + tuple(values[i]) for i, country in zip(in_sub.index, in_sub["Country"]))
+    return rows
+
+def cru_sheets(spec, rng):
+    """{sheet: raw cell grid} in the CRU market outlook layout."""
+    geography = _geography(spec, CRU_REGIONS)
+    region_of = {c: r for r, _, c in geography}
+    sheets = {}
+
+    years = _years(spec, CRU, "P4 Capacity list")
+    assets, capacity = _assets(spec, geography, years, rng)
+    header = ["Region", "Country", "Company", "Site", "Product", "Status", "PGS Scoring"] + years
+    rows = [["World", None, None, None, None, None, None] + list(capacity.sum(axis=0))]
+    scores = rng.integers(1, 6, len(assets))
+    rows += [[region_of[a.Country], a.Country, a.Company, a.Site, "P4", a.Status, scores[i]] + list(capacity[i])
+             for i, a in enumerate(assets.itertuples(index=False))]
+    sheets["P4 Capacity list"] = _grid([["P4 Capacity list"], ["'000 tonnes product"], []], header, rows)
+
+    by_country = pd.DataFrame(capacity).groupby(assets["Country"].to_numpy(), sort=False).sum()
+    by_country = by_country.reindex([c for _, _, c in geography], fill_value=0.0).to_numpy()
+    sd_years = _years(spec, CRU, "P4 Capacity")
+    balances = _balances(by_country[:, [years.index(y) for y in sd_years]], rng)
+    for metric, values in balances.items():
+        sheet = f"P4 {metric}"
+        sheets[sheet] = _grid([[sheet], ["'000 tonnes product"]], [None, None, None] + sd_years, _subtotal_rows(geography, values))
+
+    # Trade: importers down the rows, the largest exporters across the columns
+    for year, sheet in TRADE_SHEETS.items():
+        k = sd_years.index(year)
+        exports, imports = balances["Exports"][:, k], balances["Imports"][:, k]
+        top = np.argsort(exports)[::-1][:spec.exporters]
+        share = imports / imports.sum() if imports.sum() else np.zeros_like(imports)
+        flows = np.round(np.outer(share, exports[top]), 3)
+        values = np.column_stack([flows, flows.sum(axis=1)])
+        exporters = [geography[i][2] for i in top]
+        sheets[sheet] = _grid([["P4 Trade Matrix"], ["000 t product"]], [year, None, None] + exporters + [TOTAL_COLUMN],
+                              _subtotal_rows(geography, values))
+    return sheets
+
+def spg_sheets(spec, rng):
+    """{sheet: raw cell grid} in the S&P Global PIEC raw materials layout."""
+    geography = _geography(spec, SPG_REGIONS)
+    sheets = {}
+
+    years = _years(spec, SPG, "P4__AssetList")
+    assets, capacity = _assets(spec, geography, years, rng)
+    furnaces = rng.integers(1, 5, len(assets))
+    header = [None, None, "Geography", "Company", "Location", "Furnaces", "Status", "Scenario"] + years
+    rows = [[f"Asset-{i + 1}", None, a.Country, a.Company, a.Site, furnaces[i], a.Status, "Base"] + list(capacity[i])
+            for i, a in enumerate(assets.itertuples(index=False))]
+    title = [[], [], [None, None, "Asset list"], [None, None, "Nameplate capacity (thousand metric tonnes per year)"], [None, None, "Home"], []]
+    sheets["P4__AssetList"] = _grid(title, header, rows)
+
+    by_country = pd.DataFrame(capacity).groupby(assets["Country"].to_numpy(), sort=False).sum()
+    by_country = by_country.reindex([c for _, _, c in geography], fill_value=0.0).to_numpy()
+    sd_years = _years(spec, SPG, "P4_Cap_O")
+    # Asset years cover only part of the S&D span: earlier years are blank, later ones carry the last value
+    cols = [min(max(y, years[0]), years[-1]) for y in sd_years]
+    known = np.array([years[0] <= y for y in sd_years])
+    balances = _balances(by_country[:, [years.index(c) for c in cols]], rng)
+    metrics = {
+        "P4_Cap_O": ("Capacity (operational)", "kt product/year", balances["Capacity"]),
+        "P4_Cap_H": ("Capacity (nameplate)", "kt product/year", np.round(balances["Capacity"] * 1.05, 1)),
+        "P4_UR": ("Utilization rate", "% of capacity",
+                  np.round(np.divide(balances["Production"], balances["Capacity"], out=np.zeros_like(balances["Production"]),
+                                     where=balances["Capacity"] > 0) * 100, 1)),
+        "P4_P": ("Production", "kt product", balances["Production"]),
+        "P4_I": ("Imports", "kt product", balances["Imports"]),
+        "P4_E": ("Exports", "kt product", balances["Exports"]),
+        "P4_D": ("Demand", "kt product", balances["Demand"])
+    }
+    for sheet, (concept, unit, values) in metrics.items():
+        values = np.where(known[None, :], values, np.nan)
+        title = [[], [], [], [None, "Home"], [None, "Data type", "Balances (long-term)"], [None, "Commodity", "P4"],
+                 [None, "Unit of Measurement", unit], [None, "Concept", concept]]
+        rows = [[None, "Global", "Global", "Global"] + list(values.sum(axis=0))]
+        rows += [[None, r, s, c] + list(values[i]) for i, (r, s, c) in enumerate(geography)]
+        # Region subtotals trail the sheet with only the Geography cell filled
+        regions = np.array([r for r, _, _ in geography])
+        rows += [[None, None, None, region] + list(values[regions == region].sum(axis=0)) for region in SPG_REGIONS]
+        sheets[sheet] = _grid(title, [None, "Region", "Sub-region", "Geography"] + sd_years, rows)
+    return sheets
+
+
+def parse_grid(grid, source, sheet):
+    """Parse a raw grid the way the loaders parse the Excel sheet (header row, then the plan)."""
+    plan = plan_for(source, sheet)
+    header = grid.iloc[plan.header_row]
+    df = grid.iloc[plan.header_row + 1:].reset_index(drop=True).infer_objects()
+    # Same labels read_excel produces: "Unnamed: n" for blank cells, integral floats as ints
+    df.columns = [f"Unnamed: {i}" if pd.isna(c) else int(c) if isinstance(c, float) and c.is_integer() else c
+                  for i, c in enumerate(header)]
+    return plan.apply(df)
+
+def write_workbook(sheets, path):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for sheet, grid in sheets.items():
+            grid.to_excel(writer, sheet_name=sheet, header=False, index=False)
+    return path
+
+def write_parquet(sheets, source, out_dir):
+    """One Parquet file per parsed sheet under <out_dir>/<source slug>/."""
+    folder = os.path.join(out_dir, SOURCE_SLUGS[source])
+    os.makedirs(folder, exist_ok=True)
+    paths = {}
+    for sheet, grid in sheets.items():
+        paths[sheet] = os.path.join(folder, f"{sheet}.parquet")
+        parse_grid(grid, source, sheet).to_parquet(paths[sheet], index=False)
+    return paths
+
+def generate(spec, out_dir, excel=True, parquet=True):
+    """Write the synthetic CRU and S&P workbooks (and Parquet copies); returns the written paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(spec.seed)
+    written = {}
+    for source, build, name in [(CRU, cru_sheets, "cru_synthetic.xlsx"), (SPG, spg_sheets, "spg_synthetic.xlsx")]:
+        sheets = build(spec, rng)
+        missing = [s for s in sheets_for(source) if s not in sheets]
+        if missing:
+            raise ValueError(f"{source}: no generator for sheets {missing}")
+        if excel:
+            written[source] = write_workbook(sheets, os.path.join(out_dir, name))
+        if parquet:
+            written[f"{source} parquet"] = write_parquet(sheets, source, os.path.join(out_dir, "parquet"))
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic CRU / S&P Global P4 workbooks")
+    parser.add_argument("--countries", type=int, default=SyntheticSpec.countries)
+    parser.add_argument("--companies", type=int, default=SyntheticSpec.companies_per_country, help="companies per country")
+    parser.add_argument("--assets", type=int, default=SyntheticSpec.assets_per_company, help="assets per company")
+    parser.add_argument("--first-year", type=int, help="widen the year span back to this year")
+    parser.add_argument("--last-year", type=int, help="widen the year span up to this year")
+    parser.add_argument("--exporters", type=int, default=SyntheticSpec.exporters)
+    parser.add_argument("--seed", type=int, default=SyntheticSpec.seed)
+    parser.add_argument("--out", default="data/synthetic")
+    parser.add_argument("--no-excel", action="store_true")
+    parser.add_argument("--no-parquet", action="store_true")
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(args.countries, args.companies, args.assets, args.first_year, args.last_year, args.exporters, args.seed)
+    for name, path in generate(spec, args.out, excel=not args.no_excel, parquet=not args.no_parquet).items():
+        print(f"{name}: {path if isinstance(path, str) else os.path.dirname(next(iter(path.values())))}")
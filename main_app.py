@@ -6,6 +6,8 @@ from modules.supply_demand_module import show as show_supply_demand
 from modules.raw_materials_data_module import show as show_raw_materials_data
 from modules.raw_materials_analysis_module import show as show_raw_materials_analytics
 from modules.compare_sources_module import show as show_comparative_analysis
+from modules.sql_query_module import show as show_sql_query
+from modules.scenario_module import show as show_scenarios
 
 st.set_page_config(layout="wide", page_title="P4 Market Dashboard")
 
@@ -15,7 +17,9 @@ page = st.sidebar.radio("Go to:", [
     "📊 P4 Supply&Demand",
     "📄 Raw Materials Data",
     "📊 Raw Materials Analytics",
-    "📄 N&PG P4 Data"
+    "📄 N&PG P4 Data",
+    "🧮 SQL Query",
+    "🧪 Scenarios"
 ])
 
 if page == "🆚 Compare CRU vs S&PG":
@@ -28,5 +32,9 @@ elif page == "📊 Raw Materials Analytics":
     show_raw_materials_analytics()
 elif page == "📄 N&PG P4 Data":
     show_p4_data()
+elif page == "🧮 SQL Query":
+    show_sql_query()
+elif page == "🧪 Scenarios":
+    show_scenarios()
 
 st.sidebar.markdown("🆕 Version: May 07 Update")
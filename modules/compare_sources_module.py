@@ -1,11 +1,13 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from modules.raw_materials_data_module import load_raw_materials_data
-from modules.rawdata import load_raw_p4_sheets
-
-CRU_FILE = "data/specialty-phosphates-market-outlook-database-february-2025-amended.xlsx"
-SPG_FILE = "data/PRawMaterials_Datafile_PIEC_2024M11.xlsx"
+from modules.raw_materials_data_module import default_file as default_spg_file, load_raw_materials_data
+from modules.rawdata import default_file as default_cru_file, load_raw_p4_sheets
+from modules.dataset_view import build_views
+from modules.progressive import stream_charts, submit, wait_for
+from modules.sheet_registry import CRU, SPG, load_error
+from modules.reconciliation import align_sources, capacity_matrix, group_targets, reconcile, reconciliation_table, region_groups
+from modules.discrepancies import change_points, top_discrepancies
 
 CRU_SHEET = "P4 Capacity list"
 SPG_SHEET = "P4__AssetList"
@@ -17,62 +19,29 @@ COUNTRY_NAME_FIXES = {
     "Korea, Republic of": "South Korea"
 }
 
+def workbook_files(cru_file=None, spg_file=None):
+    """(CRU, S&P Global) workbook paths; a None falls back to the current default."""
+    return cru_file or default_cru_file(), spg_file or default_spg_file()
+
 def standardize_country_name(name):
     if isinstance(name, str):
         name = name.strip()
         return COUNTRY_NAME_FIXES.get(name, name)
     return name
 
-def extract_cru_table(df, year):
-    df.columns = df.columns.map(str)
-    if "Country" not in df.columns or str(year) not in df.columns:
-        return pd.DataFrame(columns=["Country", "Capacity"])
-    df = df[["Country", str(year)]].copy()
-    df["Country"] = df["Country"].apply(standardize_country_name)
-    df[str(year)] = pd.to_numeric(df[str(year)], errors="coerce")
-    df = df.dropna()
-    df = df.rename(columns={str(year): "Capacity"})
-    df = df.groupby("Country", as_index=False).sum()
-    return df
-
-def extract_spg_table(df, year):
-    df.columns = df.columns.map(str)
-    if "Geography" not in df.columns or str(year) not in df.columns:
+def extract_cru_table(view, year):
+    if year not in view.years:
         return pd.DataFrame(columns=["Country", "Capacity"])
-    df = df[["Geography", str(year)]].copy()
-    df = df.rename(columns={"Geography": "Country", str(year): "Capacity"})
-    df["Country"] = df["Country"].apply(standardize_country_name)
-    df["Capacity"] = pd.to_numeric(df["Capacity"], errors="coerce")
-    df = df.dropna()
-    df = df.groupby("Country", as_index=False).sum()
-    return df
-
-def show():
-    st.header("📊 P4 Capacity Comparison: CRU vs S&P Global (by Country)")
+    return view.year_table("Country", year, standardize_country_name, value_name="Capacity")
 
-    year = st.slider("📅 Select Year", min_value=2010, max_value=2029, value=2021)
-
-    cru_sheets = load_raw_p4_sheets(CRU_FILE)
-    spg_sheets = load_raw_materials_data(SPG_FILE)
-
-    cru_df = cru_sheets.get(CRU_SHEET)
-    spg_df = spg_sheets.get(SPG_SHEET)
-
-    if not isinstance(cru_df, pd.DataFrame) or not isinstance(spg_df, pd.DataFrame):
-        st.error("Could not load required sheets.")
-        return
-
-    # Raw tables preview
-    #st.subheader("🔍 Raw CRU Capacity Data (Summed by Country)")
-    cru_raw = extract_cru_table(cru_df, year)
-    #st.dataframe(cru_raw, use_container_width=True)
-
-    #st.subheader("🔍 Raw S&P Global Capacity Data (Summed by Country)")
-    spg_raw = extract_spg_table(spg_df, year)
-    #st.dataframe(spg_raw, use_container_width=True)
+def extract_spg_table(view, year):
+    if year not in view.years:
+        return pd.DataFrame(columns=["Country", "Capacity"])
+    df = view.year_table("Geography", year, standardize_country_name, value_name="Capacity")
+    return df.rename(columns={"Geography": "Country"})
 
-    # Comparison table
-    st.subheader("🧮 Comparative Table")
+def compare_tables(cru_raw, spg_raw):
+    """Outer-join the two per-country tables with Delta and % Difference columns."""
     df_cru = cru_raw.rename(columns={"Capacity": "CRU"})
     df_spg = spg_raw.rename(columns={"Capacity": "S&P Global"})
 
@@ -82,9 +51,15 @@ def show():
         lambda row: (row["Delta"] / row["CRU"] * 100) if row["CRU"] else 0,
         axis=1
     )
-    st.dataframe(merged, use_container_width=True)
+    return merged
 
-    st.subheader("📊 Discrepancy Bar Chart: S&P Global - CRU")
+def extract_country_years(view, key, first=2010, last=2029):
+    """Country x year sums with string year columns, one row per standardized country."""
+    df = view.group_sum(key, first, last, standardize_country_name)
+    df.columns = df.columns.astype(str)
+    return df.rename_axis("Country").reset_index()
+
+def discrepancy_bar_figure(merged):
     fig_bar = go.Figure()
     fig_bar.add_trace(go.Bar(
         x=merged["Country"],
@@ -113,37 +88,9 @@ def show():
         ),
         showlegend=True
     )
-    st.plotly_chart(fig_bar, use_container_width=True)
-
-    # Country selection and year range comparison
-    st.subheader("📈 Yearly Discrepancy for Selected Country")
-    selected_country = st.selectbox("🌍 Choose Country to Explore Over Time", merged["Country"].unique())
-    year_range = list(map(str, range(2010, 2030)))
-
-    # Extract and clean full-year data
-    cru_years = cru_df.copy()
-    cru_years.columns = cru_years.columns.map(str)
-    cru_years["Country"] = cru_years["Country"].apply(standardize_country_name)
-    cru_years = cru_years.groupby("Country")[year_range].sum().reset_index()
-
-    spg_years = spg_df.copy()
-    spg_years.columns = spg_years.columns.map(str)
-    spg_years = spg_years.rename(columns={"Geography": "Country"})
-    spg_years["Country"] = spg_years["Country"].apply(standardize_country_name)
-    spg_years = spg_years.groupby("Country")[year_range].sum().reset_index()
-
-    # Get data for the selected country
-    cru_country_series = cru_years[cru_years["Country"] == selected_country][year_range].sum()
-    spg_country_series = spg_years[spg_years["Country"] == selected_country][year_range].sum()
-
-    df_line = pd.DataFrame({
-        "Year": list(map(int, year_range)),
-        "CRU": cru_country_series.values,
-        "S&P Global": spg_country_series.values
-    })
-    df_line["Delta"] = df_line["S&P Global"] - df_line["CRU"]
+    return fig_bar
 
-    # Plot lines over time
+def country_lines_figure(df_line):
     fig_lines = go.Figure()
     fig_lines.add_trace(go.Scatter(x=df_line["Year"], y=df_line["CRU"], mode="lines+markers", name="CRU"))
     fig_lines.add_trace(go.Scatter(x=df_line["Year"], y=df_line["S&P Global"], mode="lines+markers", name="S&P Global"))
@@ -156,9 +103,9 @@ def show():
         paper_bgcolor="#0e1117",
         font_color="white"
     )
-    st.plotly_chart(fig_lines, use_container_width=True)
+    return fig_lines
 
-    # Plot delta over time
+def country_delta_figure(df_line):
     fig_delta = go.Figure()
     fig_delta.add_trace(go.Scatter(x=df_line["Year"], y=df_line["Delta"], mode="lines+markers", name="Delta (S&P - CRU)"))
     fig_delta.update_layout(
@@ -170,7 +117,136 @@ def show():
         paper_bgcolor="#0e1117",
         font_color="white"
     )
-    st.plotly_chart(fig_delta, use_container_width=True)
+    return fig_delta
+
+def china_rest_figure(df_line):
+    fig_lines = go.Figure()
+    fig_lines.add_trace(go.Scatter(
+        x=df_line["Year"], y=df_line["CRU_China"], mode="lines+markers",
+        name="CRU - China", line=dict(color="blue")
+    ))
+    fig_lines.add_trace(go.Scatter(
+        x=df_line["Year"], y=df_line["SPG_China"], mode="lines+markers",
+        name="S&P Global - China", line=dict(color="cyan")
+    ))
+    fig_lines.add_trace(go.Scatter(
+        x=df_line["Year"], y=df_line["CRU_Rest"], mode="lines+markers",
+        name="CRU - Rest of World", line=dict(color="green")
+    ))
+    fig_lines.add_trace(go.Scatter(
+        x=df_line["Year"], y=df_line["SPG_Rest"], mode="lines+markers",
+        name="S&P Global - Rest of World", line=dict(color="lightgreen")
+    ))
+
+    fig_lines.update_layout(
+        title="China vs Rest of the World Capacity Over Time",
+        xaxis_title="Year",
+        yaxis_title="Capacity (kt/y)",
+        height=450,
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        font_color="white"
+    )
+    return fig_lines
+
+def country_year_tables(cru_view, spg_view):
+    return extract_country_years(cru_view, "Country"), extract_country_years(spg_view, "Geography")
+
+def source_cubes(cru_view, spg_view, years):
+    """Aligned CRU and S&P Global country x year capacity matrices."""
+    cru_matrix = capacity_matrix(cru_view, "Country", years, standardize_country_name)
+    spg_matrix = capacity_matrix(spg_view, "Geography", years, standardize_country_name)
+    return align_sources(cru_matrix, spg_matrix)
+
+@st.cache_data
+def scan_discrepancies(cru_matrix, spg_matrix, top_n):
+    cells = top_discrepancies(cru_matrix, spg_matrix, top_n)
+    breaks = change_points(spg_matrix.fillna(0) - cru_matrix.fillna(0))
+    return cells, breaks.head(top_n)
+
+def show():
+    st.header("📊 P4 Capacity Comparison: CRU vs S&P Global (by Country)")
+
+    year = st.slider("📅 Select Year", min_value=2010, max_value=2029, value=2021)
+
+    # Imported here: the scenario page imports this module
+    from modules.scenario_module import scenario_selector
+    engine, scenario = scenario_selector("🧪 Scenario for the comparative table", key="compare_scenario")
+
+    # Both workbooks load concurrently; the table slot shows a spinner meanwhile
+    cru_file, spg_file = workbook_files()
+    cru_job = submit(load_raw_p4_sheets, cru_file)
+    spg_job = submit(load_raw_materials_data, spg_file)
+
+    st.subheader("🧮 Comparative Table")
+    table_slot = st.empty()
+    cru_sheets = wait_for(cru_job, table_slot, "Loading CRU and S&P Global workbooks...")
+    spg_sheets = wait_for(spg_job, table_slot, "Loading CRU and S&P Global workbooks...")
+
+    cru_views = build_views(cru_sheets, CRU)
+    spg_views = build_views(spg_sheets, SPG)
+
+    cru_view = cru_views.get(CRU_SHEET)
+    spg_view = spg_views.get(SPG_SHEET)
+
+    if cru_view is None or spg_view is None:
+        errors = [load_error(cru_sheets, CRU_SHEET)] if cru_view is None else []
+        errors += [load_error(spg_sheets, SPG_SHEET)] if spg_view is None else []
+        table_slot.error("  \n".join(errors))
+        return
+
+    # Cubes for the lower sections build while the table and charts render
+    years_int = list(range(2010, 2030))
+    years_job = submit(country_year_tables, cru_view, spg_view)
+    cube_job = submit(source_cubes, cru_view, spg_view, years_int)
+    chart_jobs = []
+
+    # Raw tables preview
+    #st.subheader("🔍 Raw CRU Capacity Data (Summed by Country)")
+    cru_raw = extract_cru_table(cru_view, year)
+    #st.dataframe(cru_raw, use_container_width=True)
+
+    #st.subheader("🔍 Raw S&P Global Capacity Data (Summed by Country)")
+    spg_raw = extract_spg_table(spg_view, year)
+    #st.dataframe(spg_raw, use_container_width=True)
+
+    # Under a scenario both sides come from the scenario engine (base tables plus edits)
+    if engine is not None:
+        cru_raw = engine.country_table(CRU, year, scenario)
+        spg_raw = engine.country_table(SPG, year, scenario)
+
+    # Comparison table
+    merged = compare_tables(cru_raw, spg_raw)
+    table_slot.dataframe(merged, use_container_width=True)
+    if engine is not None:
+        st.caption(f"🧪 Scenario '{scenario.name}': " + "; ".join(edit.describe() for edit in scenario.edits))
+
+    st.subheader("📊 Discrepancy Bar Chart: S&P Global - CRU")
+    chart_jobs.append((st.empty(), submit(discrepancy_bar_figure, merged)))
+
+    # Country selection and year range comparison
+    st.subheader("📈 Yearly Discrepancy for Selected Country")
+    selected_country = st.selectbox("🌍 Choose Country to Explore Over Time", merged["Country"].unique())
+    year_range = list(map(str, range(2010, 2030)))
+
+    # Extract and clean full-year data
+    cru_years, spg_years = wait_for(years_job, message="Building yearly country tables...")
+
+    # Get data for the selected country
+    cru_country_series = cru_years[cru_years["Country"] == selected_country][year_range].sum()
+    spg_country_series = spg_years[spg_years["Country"] == selected_country][year_range].sum()
+
+    df_line = pd.DataFrame({
+        "Year": list(map(int, year_range)),
+        "CRU": cru_country_series.values,
+        "S&P Global": spg_country_series.values
+    })
+    df_line["Delta"] = df_line["S&P Global"] - df_line["CRU"]
+
+    chart_jobs.append((st.empty(), submit(country_lines_figure, df_line)))
+
+    # Plot delta over time
+    chart_jobs.append((st.empty(), submit(country_delta_figure, df_line)))
     
     
     # New test
@@ -178,17 +254,7 @@ def show():
 
     year_range = list(map(str, range(2010, 2030)))
 
-    # Prepare yearly data for both CRU and SP Global
-    cru_years = cru_df.copy()
-    cru_years.columns = cru_years.columns.map(str)
-    cru_years["Country"] = cru_years["Country"].apply(standardize_country_name)
-    cru_years = cru_years.groupby("Country")[year_range].sum().reset_index()
-
-    spg_years = spg_df.copy()
-    spg_years.columns = spg_years.columns.map(str)
-    spg_years = spg_years.rename(columns={"Geography": "Country"})
-    spg_years["Country"] = spg_years["Country"].apply(standardize_country_name)
-    spg_years = spg_years.groupby("Country")[year_range].sum().reset_index()
+    # Yearly data for both CRU and SP Global: reuse cru_years / spg_years from above
 
     # Default China vs Rest
     china_label = "China"
@@ -221,34 +287,7 @@ def show():
     df_line["Delta_Rest"] = df_line["SPG_Rest"] - df_line["CRU_Rest"]
 
     # -- Plot China vs Rest --
-    fig_lines = go.Figure()
-    fig_lines.add_trace(go.Scatter(
-        x=df_line["Year"], y=df_line["CRU_China"], mode="lines+markers",
-        name="CRU - China", line=dict(color="blue")
-    ))
-    fig_lines.add_trace(go.Scatter(
-        x=df_line["Year"], y=df_line["SPG_China"], mode="lines+markers",
-        name="S&P Global - China", line=dict(color="cyan")
-    ))
-    fig_lines.add_trace(go.Scatter(
-        x=df_line["Year"], y=df_line["CRU_Rest"], mode="lines+markers",
-        name="CRU - Rest of World", line=dict(color="green")
-    ))
-    fig_lines.add_trace(go.Scatter(
-        x=df_line["Year"], y=df_line["SPG_Rest"], mode="lines+markers",
-        name="S&P Global - Rest of World", line=dict(color="lightgreen")
-    ))
-
-    fig_lines.update_layout(
-        title="China vs Rest of the World Capacity Over Time",
-        xaxis_title="Year",
-        yaxis_title="Capacity (kt/y)",
-        height=450,
-        plot_bgcolor="#0e1117",
-        paper_bgcolor="#0e1117",
-        font_color="white"
-    )
-    st.plotly_chart(fig_lines, use_container_width=True)
+    chart_jobs.append((st.empty(), submit(china_rest_figure, df_line)))
 
     # Plot delta (discrepancy) over time
     fig_delta = go.Figure()
@@ -312,6 +351,69 @@ def show():
         mime="text/csv"
     )
 
+    # Charts fill their slots in whatever order they finish
+    stream_charts(chart_jobs)
+
+    # --- Columnar exports (Parquet / Arrow IPC) ---
+    from modules.export_api import show_export_panel
+    with st.expander("📦 Columnar Export (Parquet / Arrow)"):
+        show_export_panel()
+
+    # -----------------------
+    # 🏠 Reconciled House View (blend of both sources, tied to World and regional totals)
+    # -----------------------
+    st.subheader("🏠 Reconciled House View")
+
+    cru_matrix, spg_matrix = wait_for(cube_job, message="Building country x year cubes...")
+
+    col_weight, col_constrain = st.columns(2)
+    spg_weight = col_weight.slider("⚖️ Weight on S&P Global", 0.0, 1.0, 0.5, 0.05)
+    constrain = col_constrain.checkbox("Match blended World and regional totals", value=True)
+
+    groups, targets = None, None
+    if constrain:
+        # Targets are summed from the two asset lists themselves (the CRU list's World
+        # row equals its asset sum; S&P's P4_Cap_O totals count other assets), grouped
+        # by CRU Region and by the S&P Sub-region of each Geography in P4_Cap_O
+        groups = {"World": list(cru_matrix.index)}
+        groups.update(region_groups(cru_view, "Region", "Country", standardize_country_name, prefix="CRU: "))
+        spg_cap = spg_views.get("P4_Cap_O")
+        if spg_cap is not None:
+            groups.update(region_groups(spg_cap, "Sub-region", "Geography", standardize_country_name, prefix="S&P Global: "))
+        else:
+            st.warning(f"{load_error(spg_sheets, 'P4_Cap_O')} S&P Global sub-region totals are not constrained.")
+        groups = {name: [c for c in members if c in cru_matrix.index] for name, members in groups.items()}
+        groups = {name: members for name, members in groups.items() if members}
+        targets = group_targets(cru_matrix, spg_matrix, spg_weight, groups)
+        st.caption(f"Constrained to {len(groups)} totals: World, {sum(n.startswith('CRU') for n in groups)} CRU regions "
+                   f"and {sum(n.startswith('S&P') for n in groups)} S&P Global sub-regions.")
+
+    house_view = reconcile(cru_matrix, spg_matrix, spg_weight, groups, targets)
+    st.dataframe(house_view.style.format("{:,.0f}"), use_container_width=True)
+
+    df_reconciled = reconciliation_table(cru_matrix, spg_matrix, house_view)
+    st.download_button(
+        label="📥 Download Reconciled Series as CSV",
+        data=df_reconciled.to_csv(index=False),
+        file_name="reconciled_house_view.csv",
+        mime="text/csv"
+    )
+
+
+    # -----------------------
+    # 🚨 Top Discrepancies (all country x year cells in one pass)
+    # -----------------------
+    st.subheader("🚨 Top Discrepancies")
+    top_n = st.selectbox("🔢 Discrepancies to list", options=[10, 20, 50, 100], index=1)
+    df_cells, df_breaks = scan_discrepancies(cru_matrix, spg_matrix, top_n)
+
+    col_cells, col_breaks = st.columns(2)
+    with col_cells:
+        st.markdown("##### 🎯 Outlier Cells (robust z-score of Delta)")
+        st.dataframe(df_cells.style.format({"CRU": "{:,.0f}", "S&P Global": "{:,.0f}", "Delta": "{:,.0f}", "Robust Z": "{:,.1f}"}), use_container_width=True, hide_index=True)
+    with col_breaks:
+        st.markdown("##### 📉 Structural Breaks in Delta Series")
+        st.dataframe(df_breaks.style.format({"Mean Before": "{:,.0f}", "Mean After": "{:,.0f}", "Shift": "{:,.0f}", "Score": "{:,.1f}"}), use_container_width=True, hide_index=True)
 
     # -----------------------
     # 📝 Insights / Discussion (with delete option)
@@ -0,0 +1,119 @@
+# modules/dataset_view.py
+#
+# Immutable views over the loaders' DataFrames. Each view copies the year
+# block of its sheet once into a read-only float32 array and normalizes the
+# key columns once (stripped strings, None for blanks). Extraction helpers
+# return slices of those arrays, so pages never mutate or defensively copy
+# the shared loader frames.
+
+import numpy as np
+import pandas as pd
+
+from modules.sheet_registry import plan_for
+
+
+def _readonly(arr):
+    arr.flags.writeable = False
+    return arr
+
+def _normalize_keys(series):
+    return np.array([v.strip() if isinstance(v, str) and v.strip() else None for v in series], dtype=object)
+
+
+class SheetView:
+    """Read-only, NumPy-backed view of one parsed sheet."""
+
+    def __init__(self, df, source, sheet):
+        plan = plan_for(source, sheet)
+        self.source = source
+        self.sheet = sheet
+        self.year_labels = list(plan.year_columns)
+        self.years = _readonly(np.array([int(y) for y in self.year_labels], dtype=np.int32))
+        self.values = _readonly(np.ascontiguousarray(df[self.year_labels].to_numpy(dtype=plan.value_dtype)))
+        self.keys = {col: _readonly(_normalize_keys(df[col])) for col in plan.key_columns}
+        self._normalized = {}
+        self._lowered = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def year_slice(self, first=None, last=None):
+        """Contiguous column slice of `values` covering [first, last]."""
+        start = 0 if first is None else int(np.searchsorted(self.years, first, side="left"))
+        stop = len(self.years) if last is None else int(np.searchsorted(self.years, last, side="right"))
+        return slice(start, stop)
+
+    def year(self, year):
+        """Values of one year for every row (a read-only view, no copy)."""
+        block = self.values[:, self.year_slice(year, year)]
+        # A column of the C-ordered block is a strided view; ravel() would copy it
+        return block[:, 0] if block.shape[1] else block.ravel()
+
+    def key(self, col, standardize=None):
+        """Normalized key column, optionally mapped through `standardize` (computed once per mapping)."""
+        if standardize is None:
+            return self.keys[col]
+        cache_key = (col, standardize)
+        if cache_key not in self._normalized:
+            self._normalized[cache_key] = _readonly(np.array([standardize(v) if v is not None else None for v in self.keys[col]], dtype=object))
+        return self._normalized[cache_key]
+
+    def mask(self, col, value, case_sensitive=True, standardize=None):
+        keys = self.key(col, standardize)
+        if case_sensitive:
+            return keys == value
+        cache_key = col if standardize is None else (col, standardize)
+        if cache_key not in self._lowered:
+            self._lowered[cache_key] = _readonly(np.array([v.lower() if v is not None else None for v in keys], dtype=object))
+        return self._lowered[cache_key] == value.lower()
+
+    def unique(self, col):
+        return sorted({v for v in self.keys[col] if v is not None})
+
+    def row(self, col, value, first=None, last=None, case_sensitive=True, standardize=None):
+        """First row whose key matches, as a year-indexed Series backed by `values`."""
+        cols = self.year_slice(first, last)
+        matches = np.flatnonzero(self.mask(col, value, case_sensitive, standardize))
+        if len(matches) == 0:
+            return pd.Series([None] * len(self.years[cols]), index=self.years[cols].astype(int))
+        return pd.Series(self.values[matches[0], cols], index=self.years[cols].astype(int), copy=False)
+
+    def year_table(self, col, year, standardize=None, value_name="Value"):
+        """Non-blank (key, value) pairs of one year summed by key."""
+        keys = self.key(col, standardize)
+        values = self.year(year)
+        keep = (keys != None) & ~np.isnan(values)  # noqa: E711 - elementwise on object array
+        df = pd.DataFrame({col: keys[keep], value_name: values[keep]})
+        return df.groupby(col, as_index=False, sort=True)[value_name].sum()
+
+    def group_sum(self, col, first=None, last=None, standardize=None, rows=None, min_count=0):
+        """Key x year sums over [first, last] (rows with a blank key are skipped).
+
+        Returns a DataFrame indexed by key with int year columns. With
+        `min_count=1` a group whose values are all blank sums to NaN.
+        """
+        keys = self.key(col, standardize)
+        cols = self.year_slice(first, last)
+        keep = keys != None  # noqa: E711
+        if rows is not None:
+            keep &= rows
+        groups, inverse = np.unique(keys[keep].astype(str), return_inverse=True)
+        block = self.values[keep, cols]
+
+        sums = np.zeros((len(groups), block.shape[1]), dtype=np.float64)
+        np.add.at(sums, inverse, np.nan_to_num(block))
+        if min_count:
+            counts = np.zeros_like(sums)
+            np.add.at(counts, inverse, ~np.isnan(block))
+            sums[counts < min_count] = np.nan
+        table = pd.DataFrame(sums, index=pd.Index(groups, name=col), columns=self.years[cols].astype(int))
+        return table
+
+
+def build_views(sheets, source):
+    """SheetView per loaded sheet that has registered year columns."""
+    views = {}
+    for sheet, df in sheets.items():
+        if isinstance(df, pd.DataFrame) and plan_for(source, sheet).year_columns:
+            views[sheet] = SheetView(df, source, sheet)
+    return views
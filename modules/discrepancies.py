@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# Scales a median absolute deviation to a standard deviation for normal data
+MAD_SCALE = 1.4826
+
+def _robust_scale(values, axis=None):
+    """MAD-based scale, falling back to the mean absolute deviation where MAD is 0.
+
+    A constant series has no spread at all; its scale is 1 so every z-score is 0.
+    """
+    median = np.nanmedian(values, axis=axis, keepdims=True)
+    dev = np.abs(values - median)
+    mad = MAD_SCALE * np.nanmedian(dev, axis=axis, keepdims=True)
+    mean_ad = 1.2533 * np.nanmean(dev, axis=axis, keepdims=True)
+    scale = np.where(mad > 0, mad, mean_ad)
+    return median, np.where(scale > 0, scale, 1.0)
+
+def robust_zscores(delta):
+    """Robust z-score of every country x year delta against all cells."""
+    values = delta.to_numpy(dtype=np.float64)
+    median, scale = _robust_scale(values)
+    return pd.DataFrame((values - median) / scale, index=delta.index, columns=delta.columns)
+
+def change_points(delta):
+    """Best single mean-shift split of each country's delta series.
+
+    For a split after position k the SSE reduction is
+    k (n - k) / n * (mean_left - mean_right)^2; it is evaluated for every
+    country and split at once from cumulative sums.
+    """
+    values = np.nan_to_num(delta.to_numpy(dtype=np.float64))
+    n = values.shape[1]
+    if n < 2:
+        return pd.DataFrame(columns=["Country", "Break Year", "Mean Before", "Mean After", "Shift", "Score"])
+
+    k = np.arange(1, n)
+    csum = np.cumsum(values, axis=1)[:, :-1]
+    total = values.sum(axis=1, keepdims=True)
+    mean_left = csum / k
+    mean_right = (total - csum) / (n - k)
+    gain = k * (n - k) / n * (mean_left - mean_right) ** 2
+
+    best = gain.argmax(axis=1)
+    rows = np.arange(len(values))
+    shift = mean_right[rows, best] - mean_left[rows, best]
+
+    # Shift measured against the typical year-on-year movement of the delta
+    _, step_scale = _robust_scale(np.diff(values, axis=1))
+    score = np.abs(shift) / step_scale.ravel()[0]
+
+    return pd.DataFrame({
+        "Country": delta.index,
+        "Break Year": delta.columns.to_numpy()[best + 1],
+        "Mean Before": mean_left[rows, best],
+        "Mean After": mean_right[rows, best],
+        "Shift": shift,
+        "Score": score
+    }).sort_values("Score", ascending=False, ignore_index=True)
+
+def top_discrepancies(cru, spg, top_n=20):
+    """Rank the country-year cells where S&P Global and CRU disagree most."""
+    delta = spg.fillna(0) - cru.fillna(0)
+    z = robust_zscores(delta)
+
+    table = pd.DataFrame({
+        "Country": np.repeat(delta.index.to_numpy(), len(delta.columns)),
+        "Year": np.tile(delta.columns.to_numpy(), len(delta.index)),
+        "CRU": cru.to_numpy().ravel(),
+        "S&P Global": spg.to_numpy().ravel(),
+        "Delta": delta.to_numpy().ravel(),
+        "Robust Z": z.to_numpy().ravel()
+    })
+    order = np.argsort(-np.nan_to_num(np.abs(table["Robust Z"].to_numpy()), nan=0.0), kind="stable")
+    return table.iloc[order[:top_n]].reset_index(drop=True)
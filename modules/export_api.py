@@ -0,0 +1,283 @@
+# modules/export_api.py
+#
+# Columnar (Parquet / Arrow IPC) exports of the parsed datasets, used by the
+# dashboard download buttons and by a small local HTTP endpoint:
+#
+#   python -m modules.export_api --port 8765
+#   curl "http://localhost:8765/comparison.parquet?source=CRU&year_min=2020" -o cmp.parquet
+
+import argparse
+import io
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import streamlit as st
+
+from modules import lineage
+from modules.compare_sources_module import CRU_SHEET, SPG_SHEET, standardize_country_name, workbook_files
+from modules.dataset_view import build_views
+from modules.raw_materials_analysis_module import METRICS as SPG_METRICS
+from modules.raw_materials_data_module import load_raw_materials_data
+from modules.rawdata import load_raw_p4_sheets
+from modules.reconciliation import align_sources, capacity_matrix
+from modules.sheet_registry import CRU, SHEET_SCHEMAS, SPG
+from modules.supply_demand_module import METRICS as CRU_METRICS
+
+DATASETS = ["facts", "comparison", "gaps"]
+FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream"
+}
+# Codecs each format can write; Arrow IPC buffers only support zstd and lz4
+COMPRESSIONS = {
+    "parquet": ["zstd", "lz4", "snappy", "none"],
+    "arrow": ["zstd", "lz4", "none"]
+}
+COMPARISON_YEARS = range(2010, 2030)
+
+# Rows per record batch / Parquet row group when streaming
+BATCH_ROWS = 64_000
+
+def _long_rows(view, key, rows, source, metric):
+    countries = view.key(key, standardize_country_name)[rows]
+    return pd.DataFrame({
+        "Source": source,
+        "Metric": metric,
+        "Country": np.repeat(countries, len(view.years)),
+        "Year": np.tile(view.years, len(countries)),
+        "Value": view.values[rows].ravel().astype(np.float64)
+    }).dropna(subset=["Value"])
+
+def build_fact_table(cru_views, spg_views):
+    """Tidy Source / Metric / Country / Year / Value table of the S&D sheets."""
+    frames = []
+    for sheet, metric in CRU_METRICS.items():
+        view = cru_views.get(sheet)
+        if view is not None:
+            # Country rows carry the macro region in the Region column; subtotals end in "Total"
+            rows = np.array([r is not None and not r.endswith("Total") for r in view.keys["Region"]], dtype=bool)
+            frames.append(_long_rows(view, "Country", rows, "CRU", metric))
+    for sheet, metric in SPG_METRICS.items():
+        view = spg_views.get(sheet)
+        if view is not None:
+            rows = np.array([r is not None and r != "Global" for r in view.keys["Region"]], dtype=bool)
+            frames.append(_long_rows(view, "Geography", rows, "S&P Global", metric))
+    return pd.concat(frames, ignore_index=True)
+
+def build_comparison_tables(cru_view, spg_view):
+    """Long capacity-list cube (Source / Country / Year / Capacity) and its gap table."""
+    cru = capacity_matrix(cru_view, "Country", COMPARISON_YEARS, standardize_country_name)
+    spg = capacity_matrix(spg_view, "Geography", COMPARISON_YEARS, standardize_country_name)
+    cru, spg = align_sources(cru, spg)
+
+    cube = pd.concat({"CRU": cru, "S&P Global": spg}, names=["Source"])
+    cube = cube.melt(ignore_index=False, var_name="Year", value_name="Capacity").reset_index()
+    cube["Year"] = cube["Year"].astype("int32")
+
+    gaps = cube.pivot_table(index=["Country", "Year"], columns="Source", values="Capacity", aggfunc="sum", fill_value=0)
+    gaps = gaps.reindex(columns=["CRU", "S&P Global"], fill_value=0).reset_index()
+    gaps.columns.name = None
+    gaps["Delta"] = gaps["S&P Global"] - gaps["CRU"]
+    gaps["% Difference"] = (gaps["Delta"] / gaps["CRU"].where(gaps["CRU"] != 0) * 100).fillna(0)
+    return cube, gaps
+
+def sheet_table_name(source, sheet):
+    """SQL table name of a registered sheet, e.g. cru_p4_capacity_list or spg_p4_cap_o."""
+    words = "".join(c if c.isalnum() else " " for c in sheet.lower()).split()
+    return "_".join(["cru" if source == CRU else "spg"] + words)
+
+# One table per registered sheet, as normalized and compacted by its parse plan
+SHEET_TABLES = {sheet_table_name(*key): key for key in SHEET_SCHEMAS}
+
+@st.cache_resource(max_entries=4)
+def _export_tables(cru_file, spg_file, version):
+    """Parse both workbooks once per lineage version into Arrow tables keyed by dataset name.
+
+    The tables are immutable, so they are shared rather than pickled and
+    copied for every caller as st.cache_data would.
+
+    Besides DATASETS, every registered sheet that loaded is included under
+    its SHEET_TABLES name for the Parquet cache and the SQL layer.
+    """
+    sheets = {CRU: load_raw_p4_sheets(cru_file), SPG: load_raw_materials_data(spg_file)}
+    cru_views = build_views(sheets[CRU], CRU)
+    spg_views = build_views(sheets[SPG], SPG)
+    cube, gaps = build_comparison_tables(cru_views[CRU_SHEET], spg_views[SPG_SHEET])
+    frames = {"facts": build_fact_table(cru_views, spg_views), "comparison": cube, "gaps": gaps}
+    for name, (source, sheet) in SHEET_TABLES.items():
+        df = sheets[source].get(sheet)
+        if isinstance(df, pd.DataFrame):
+            frames[name] = df
+    lineage.note_built("export_tables", version, cru_file=cru_file, spg_file=spg_file)
+    return {name: pa.Table.from_pandas(df, preserve_index=False) for name, df in frames.items()}
+
+def load_export_tables(cru_file=None, spg_file=None):
+    """Export tables of the current workbooks, constants and builders (see modules/lineage.py)."""
+    cru_file, spg_file = workbook_files(cru_file, spg_file)
+    return _export_tables(cru_file, spg_file, lineage.version("export_tables", cru_file=cru_file, spg_file=spg_file))
+
+def filter_table(table, sources=None, countries=None, year_min=None, year_max=None):
+    """Apply predicate filters; a filter on a column the table lacks is ignored."""
+    mask = None
+    def _and(cond):
+        return cond if mask is None else pc.and_(mask, cond)
+
+    if sources and "Source" in table.column_names:
+        mask = _and(pc.is_in(table["Source"], value_set=pa.array(sources)))
+    if countries and "Country" in table.column_names:
+        mask = _and(pc.is_in(table["Country"], value_set=pa.array(countries)))
+    if year_min is not None and "Year" in table.column_names:
+        mask = _and(pc.greater_equal(table["Year"], year_min))
+    if year_max is not None and "Year" in table.column_names:
+        mask = _and(pc.less_equal(table["Year"], year_max))
+    return table if mask is None else table.filter(mask)
+
+def write_table(table, sink, fmt="parquet", compression="zstd"):
+    """Stream `table` to a binary file-like `sink` one record batch at a time."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    if compression not in COMPRESSIONS[fmt]:
+        raise ValueError(f"{fmt} compression must be one of {', '.join(COMPRESSIONS[fmt])}")
+    codec = None if compression == "none" else compression
+    if fmt == "parquet":
+        with pq.ParquetWriter(sink, table.schema, compression=codec or "none") as writer:
+            for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+                writer.write_batch(batch)
+    elif fmt == "arrow":
+        with ipc.new_stream(sink, table.schema, options=ipc.IpcWriteOptions(compression=codec)) as writer:
+            for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+                writer.write_batch(batch)
+
+def export_bytes(table, fmt="parquet", compression="zstd"):
+    buffer = io.BytesIO()
+    write_table(table, buffer, fmt, compression)
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=16)
+def _filtered_export(cru_file, spg_file, version, dataset, fmt, compression, sources, countries, year_min, year_max):
+    """Serialized download, once per dataset version, format and filter combination."""
+    table = filter_table(load_export_tables(cru_file, spg_file)[dataset], sources, countries, year_min, year_max)
+    return export_bytes(table, fmt, compression)
+
+def show_export_panel(key="export"):
+    """Download widgets for the columnar exports (embedded in dashboard pages)."""
+    cru_file, spg_file = workbook_files()
+    tables = load_export_tables(cru_file, spg_file)
+    col_ds, col_fmt, col_comp = st.columns(3)
+    dataset = col_ds.selectbox("🗂️ Dataset", DATASETS, key=f"{key}_dataset")
+    fmt = col_fmt.selectbox("💾 Format", list(FORMATS), key=f"{key}_format")
+    compression = col_comp.selectbox("🗜️ Compression", COMPRESSIONS[fmt], key=f"{key}_compression_{fmt}")
+
+    table = tables[dataset]
+    col_src, col_ctry, col_years = st.columns(3)
+    sources = col_src.multiselect("Source", ["CRU", "S&P Global"], key=f"{key}_sources") if "Source" in table.column_names else []
+    countries = col_ctry.multiselect("Country", sorted(pc.unique(table["Country"]).to_pylist()), key=f"{key}_countries")
+    years = pc.min_max(table["Year"]).as_py()
+    year_min, year_max = col_years.slider("Years", years["min"], years["max"], (years["min"], years["max"]), key=f"{key}_years")
+
+    filtered = filter_table(table, sources, countries, year_min, year_max)
+    st.caption(f"{filtered.num_rows:,} rows")
+    # Serialized only when the button is clicked, not on every rerun of the page
+    version = lineage.version("export_tables", cru_file=cru_file, spg_file=spg_file)
+    st.download_button(
+        label=f"📥 Download {dataset}.{fmt}",
+        data=lambda: _filtered_export(cru_file, spg_file, version, dataset, fmt, compression, tuple(sources), tuple(countries), year_min, year_max),
+        file_name=f"{dataset}.{fmt}",
+        mime=FORMATS[fmt],
+        key=f"{key}_download"
+    )
+
+class _ChunkedWriter:
+    """File-like wrapper emitting HTTP/1.1 chunked transfer encoding."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+class ExportRequestHandler(BaseHTTPRequestHandler):
+    """GET /<dataset>.<format>?source=&country=&year_min=&year_max=&compression="""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        name, _, fmt = url.path.strip("/").partition(".")
+        fmt = fmt or "parquet"
+
+        if url.path.strip("/") == "":
+            return self._send_text(200, "Datasets: " + ", ".join(f"/{d}.parquet, /{d}.arrow" for d in DATASETS))
+        if name not in DATASETS or fmt not in FORMATS:
+            return self._send_text(404, f"Unknown dataset '{url.path}'")
+
+        try:
+            year_min = int(params["year_min"][0]) if "year_min" in params else None
+            year_max = int(params["year_max"][0]) if "year_max" in params else None
+        except ValueError:
+            return self._send_text(400, "year_min / year_max must be integers")
+        compression = params.get("compression", ["zstd"])[0]
+        if compression not in COMPRESSIONS[fmt]:
+            return self._send_text(400, f"{fmt} compression must be one of {', '.join(COMPRESSIONS[fmt])}")
+
+        table = filter_table(
+            load_export_tables()[name],
+            sources=params.get("source"),
+            countries=params.get("country"),
+            year_min=year_min,
+            year_max=year_max
+        )
+
+        self.send_response(200)
+        self.send_header("Content-Type", FORMATS[fmt])
+        self.send_header("Content-Disposition", f'attachment; filename="{name}.{fmt}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sink = _ChunkedWriter(self.wfile)
+        write_table(table, pa.PythonFile(sink, mode="w"), fmt, compression)
+        sink.close()
+
+    def _send_text(self, status, text):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(host="127.0.0.1", port=8765):
+    server = ThreadingHTTPServer((host, port), ExportRequestHandler)
+    print(f"Serving exports on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP endpoint for columnar dataset exports")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    serve(args.host, args.port)
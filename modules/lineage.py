@@ -0,0 +1,304 @@
+# modules/lineage.py
+#
+# Dependency graph of the derived (cached) artifacts. Each node lists what it
+# is built from: workbook files (content fingerprints), configuration
+# constants (COUNTRY_NAME_FIXES, HEADER_ROWS, METRICS, sheet layouts) and the
+# code that builds it (function or module source), plus its upstream nodes.
+# A node's version is a hash of all of that, so a change to one input gives
+# new versions to exactly the artifacts downstream of it. Cached builders
+# take the version as an extra cache-key argument, which makes serving a
+# stale artifact impossible and leaves unaffected caches alone.
+#
+#   python -m modules.lineage                  # every node: version, build state
+#   python -m modules.lineage --node gaps      # one node's inputs and columns
+#   python -m modules.lineage --dot            # Graphviz source of the graph
+
+import argparse
+import hashlib
+import importlib
+import inspect
+import os
+import threading
+from dataclasses import dataclass, fields, is_dataclass
+from datetime import datetime
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Node:
+    name: str
+    description: str
+    # Keyword parameters of version() that hold workbook paths
+    files: tuple = ()
+    # "module:ATTR" constants
+    config: tuple = ()
+    # "module" (whole file) or "module:function" sources
+    code: tuple = ()
+    deps: tuple = ()
+    # (column, derived from) pairs
+    columns: tuple = ()
+
+
+_VIEWS = "modules.dataset_view"
+_FIXES = "modules.compare_sources_module:COUNTRY_NAME_FIXES"
+_STANDARDIZE = "modules.compare_sources_module:standardize_country_name"
+
+NODES = [
+    Node("cru_sheets", "CRU workbook parsed with the registered layouts",
+         files=("cru_file",),
+         config=("modules.sheet_registry:PARSE_PLANS[CRU]",),
+         code=("modules.sheet_registry", "modules.rawdata:load_raw_p4_sheets")),
+    Node("spg_sheets", "S&P Global workbook parsed with the registered layouts",
+         files=("spg_file",),
+         config=("modules.sheet_registry:PARSE_PLANS[S&P Global]", "modules.raw_materials_data_module:HEADER_ROWS"),
+         code=("modules.sheet_registry", "modules.raw_materials_data_module:load_raw_materials_data")),
+    Node("facts", "Tidy Source / Metric / Country / Year / Value table of the S&D sheets",
+         config=("modules.supply_demand_module:METRICS", "modules.raw_materials_analysis_module:METRICS", _FIXES),
+         code=(_VIEWS, _STANDARDIZE, "modules.export_api:_long_rows", "modules.export_api:build_fact_table"),
+         deps=("cru_sheets", "spg_sheets"),
+         columns=(("Source", "CRU / S&P Global (constant per sheet)"),
+                  ("Metric", "supply_demand_module.METRICS / raw_materials_analysis_module.METRICS sheet names"),
+                  ("Country", "CRU Country / S&P Global Geography, through COUNTRY_NAME_FIXES"),
+                  ("Year", "registered year columns of each sheet"),
+                  ("Value", "year cells of the country rows (subtotal and Global rows dropped)"))),
+    Node("comparison", "Long CRU vs S&P Global capacity-list cube",
+         config=(_FIXES, "modules.compare_sources_module:CRU_SHEET", "modules.compare_sources_module:SPG_SHEET",
+                 "modules.export_api:COMPARISON_YEARS"),
+         code=(_VIEWS, _STANDARDIZE, "modules.reconciliation:capacity_matrix", "modules.reconciliation:align_sources",
+               "modules.export_api:build_comparison_tables"),
+         deps=("cru_sheets", "spg_sheets"),
+         columns=(("Source", "CRU / S&P Global"),
+                  ("Country", "CRU 'P4 Capacity list'.Country / S&P Global 'P4__AssetList'.Geography, through COUNTRY_NAME_FIXES"),
+                  ("Year", "COMPARISON_YEARS"),
+                  ("Capacity", "asset capacities summed per country and year"))),
+    Node("gaps", "Country x year S&P Global - CRU capacity gaps",
+         code=("modules.export_api:build_comparison_tables",),
+         deps=("comparison",),
+         columns=(("CRU", "comparison.Capacity where Source = CRU"),
+                  ("S&P Global", "comparison.Capacity where Source = S&P Global"),
+                  ("Delta", "S&P Global - CRU"),
+                  ("% Difference", "Delta / CRU * 100 (0 where CRU is 0)"))),
+    Node("export_tables", "Arrow tables behind the exports and the SQL page, plus one per registered sheet",
+         code=("modules.export_api:_export_tables", "modules.export_api:sheet_table_name"),
+         deps=("facts", "comparison", "gaps", "cru_sheets", "spg_sheets")),
+    Node("parquet_cache", "Parquet files of the export and sheet tables under data/cache/",
+         code=("modules.export_api:write_table", "modules.query_engine:materialize"),
+         deps=("export_tables",)),
+    Node("sql_tables", "In-memory DuckDB tables loaded from the Parquet cache",
+         code=("modules.query_engine:_connect",),
+         deps=("parquet_cache",)),
+    Node("trade_matrix", "Exporter x importer trade matrices of the CRU trade sheets",
+         code=("modules.trade_matrix",),
+         deps=("cru_sheets",)),
+    Node("scenario_engine", "Base asset-list views and country aggregates of the scenario engine",
+         config=(_FIXES, "modules.compare_sources_module:CRU_SHEET", "modules.compare_sources_module:SPG_SHEET"),
+         code=(_VIEWS, _STANDARDIZE, "modules.scenarios", "modules.reconciliation:capacity_matrix",
+               "modules.scenario_module:load_scenario_engine"),
+         deps=("cru_sheets", "spg_sheets")),
+    Node("report_dataset", "Views of both workbooks shared by the report pack workers",
+         code=(_VIEWS, "modules.report_pack:load_dataset"),
+         deps=("cru_sheets", "spg_sheets")),
+]
+GRAPH = {node.name: node for node in NODES}
+
+# Memoized file fingerprints, keyed by what makes them change
+_file_hashes = {}
+# ref -> (imported module or function, hash of its source)
+_code_hashes = {}
+# Versions built in this process: (node, params) -> (version, time, {input: fingerprint})
+_built = {}
+_lock = threading.Lock()
+
+
+def _sha(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+def _canonical(obj):
+    """Deterministic text of a constant (dict order and object ids don't matter)."""
+    if isinstance(obj, dict):
+        return "{" + ",".join(sorted(f"{_canonical(k)}:{_canonical(v)}" for k, v in obj.items())) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ",".join(_canonical(v) for v in obj) + "]"
+    if isinstance(obj, (set, frozenset)):
+        return "{" + ",".join(sorted(_canonical(v) for v in obj)) + "}"
+    if isinstance(obj, range):
+        return f"range({obj.start},{obj.stop},{obj.step})"
+    if is_dataclass(obj):
+        return type(obj).__name__ + _canonical({f.name: getattr(obj, f.name) for f in fields(obj)})
+    return repr(obj)
+
+def _resolve(ref):
+    """Object named by "module:ATTR"; "ATTR[source]" picks one source's entries of a (source, sheet) dict."""
+    module_name, _, attr = ref.partition(":")
+    obj = importlib.import_module(module_name)
+    if not attr:
+        return obj
+    name, _, source = attr.partition("[")
+    obj = getattr(obj, name)
+    if source:
+        obj = {key: value for key, value in obj.items() if key[0] == source.rstrip("]")}
+    return obj
+
+def file_fingerprint(path):
+    """Content hash of a file, recomputed only when its size or mtime changes."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "missing"
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _file_hashes[key] = digest.hexdigest()[:12]
+    return _file_hashes[key]
+
+def config_fingerprint(ref):
+    return _sha(_canonical(_resolve(ref)))
+
+def code_fingerprint(ref):
+    """Hash of the source of an imported module or function.
+
+    The source is read once per imported object, the first time it is
+    fingerprinted (pages do so right after importing), so editing a file
+    does not change the version of the code this process is running. A
+    re-imported module (Streamlit reloads edited modules) is a new object
+    and gets a new fingerprint.
+    """
+    obj = _resolve(ref)
+    cached = _code_hashes.get(ref)
+    if cached is None or cached[0] is not obj:
+        cached = _code_hashes[ref] = (obj, _sha(inspect.getsource(obj)))
+    return cached[1]
+
+def inputs(name, **params):
+    """{input label: fingerprint} of one node's own inputs and its upstream nodes' versions."""
+    node = GRAPH[name]
+    found = {}
+    for param in node.files:
+        path = params[param]
+        found[f"file {param}={path}"] = file_fingerprint(path)
+    for ref in node.config:
+        found[f"config {ref}"] = config_fingerprint(ref)
+    for ref in node.code:
+        found[f"code {ref}"] = code_fingerprint(ref)
+    for dep in node.deps:
+        found[f"node {dep}"] = version(dep, **params)
+    return found
+
+def version(name, **params):
+    """Version of a node for the given workbook paths: changes iff any transitive input changes."""
+    return _sha(_canonical(inputs(name, **params)))
+
+def _params_key(name, params):
+    """Build-record key: only the workbook paths the node reads, directly or upstream."""
+    used = {param for node in [name] + upstream(name) for param in GRAPH[node].files}
+    return name, tuple(sorted((k, v) for k, v in params.items() if k in used))
+
+def note_built(name, built_version, **params):
+    """Record that `name` was (re)built at `built_version` in this process, and the inputs behind it.
+
+    If an input changed while it was being built, no inputs are recorded
+    (explain then lists them all as changed).
+    """
+    found = inputs(name, **params)
+    recorded = found if _sha(_canonical(found)) == built_version else {}
+    with _lock:
+        _built[_params_key(name, params)] = (built_version, datetime.now(), recorded)
+
+def upstream(name):
+    """Node names `name` depends on, transitively, nearest first."""
+    seen = []
+    pending = list(GRAPH[name].deps)
+    while pending:
+        dep = pending.pop(0)
+        if dep not in seen:
+            seen.append(dep)
+            pending.extend(GRAPH[dep].deps)
+    return seen
+
+def downstream(name):
+    """Node names that would be invalidated by a change to `name`."""
+    return [n.name for n in NODES if name in upstream(n.name)]
+
+def explain(**params):
+    """One row per node: current version, whether this process holds it, an older build or none,
+    and for a stale build the inputs that changed since."""
+    rows = []
+    for node in NODES:
+        current = version(node.name, **params)
+        built = _built.get(_params_key(node.name, params))
+        changed = []
+        if built is None:
+            state, built_at = "not built", None
+        else:
+            state, built_at = ("fresh" if built[0] == current else "stale"), built[1]
+            if state == "stale":
+                changed = changed_inputs(built[2], node.name, **params)
+        rows.append({
+            "Node": node.name,
+            "Depends On": ", ".join(node.deps),
+            "Version": current,
+            "State": state,
+            "Built At": built_at,
+            "Changed Inputs": ", ".join(changed),
+            "Description": node.description
+        })
+    return pd.DataFrame(rows)
+
+def inputs_table(name, **params):
+    return pd.DataFrame([{"Input": label, "Fingerprint": fp} for label, fp in inputs(name, **params).items()])
+
+def columns_table(name):
+    return pd.DataFrame(list(GRAPH[name].columns), columns=["Column", "Derived From"])
+
+def changed_inputs(recorded, name, **params):
+    """Labels of inputs whose fingerprint differs from a recorded {label: fingerprint} mapping."""
+    current = inputs(name, **params)
+    return sorted(label for label in set(current) | set(recorded) if current.get(label) != recorded.get(label))
+
+def to_dot():
+    """Graphviz source: workbook and config inputs as boxes, artifacts as ellipses."""
+    lines = ["digraph lineage {", "  rankdir=LR;", '  node [fontname="sans-serif", fontsize=10];']
+    for node in NODES:
+        lines.append(f'  "{node.name}" [shape=ellipse];')
+        for param in node.files:
+            lines.append(f'  "{param}" [shape=box, style=filled, fillcolor=lightsteelblue];')
+            lines.append(f'  "{param}" -> "{node.name}";')
+        for ref in node.config:
+            label = ref.split(":")[-1]
+            lines.append(f'  "{label}" [shape=box, style=filled, fillcolor=khaki];')
+            lines.append(f'  "{label}" -> "{node.name}";')
+        for dep in node.deps:
+            lines.append(f'  "{dep}" -> "{node.name}";')
+    lines.append("}")
+    return "\n".join(lines)
+
+def default_params():
+    from modules.compare_sources_module import workbook_files
+    cru_file, spg_file = workbook_files()
+    return {"cru_file": cru_file, "spg_file": spg_file}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the dependency graph of the cached artifacts")
+    parser.add_argument("--node", choices=list(GRAPH), help="show one node's inputs and column lineage")
+    parser.add_argument("--dot", action="store_true", help="print the graph as Graphviz source")
+    parser.add_argument("--cru-file")
+    parser.add_argument("--spg-file")
+    args = parser.parse_args()
+
+    params = default_params()
+    params.update({k: v for k, v in (("cru_file", args.cru_file), ("spg_file", args.spg_file)) if v})
+    with pd.option_context("display.width", 200, "display.max_colwidth", 90):
+        if args.dot:
+            print(to_dot())
+        elif args.node:
+            print(f"{args.node} {version(args.node, **params)}: {GRAPH[args.node].description}\n")
+            print(inputs_table(args.node, **params).to_string(index=False))
+            if GRAPH[args.node].columns:
+                print("\n" + columns_table(args.node).to_string(index=False))
+            print(f"\nInvalidates: {', '.join(downstream(args.node)) or 'nothing downstream'}")
+        else:
+            print(explain(**params).drop(columns=["Built At", "Changed Inputs"]).to_string(index=False))
@@ -1,14 +1,54 @@
 # modules/p4_data_module.py
 
 import streamlit as st
-from modules.rawdata import load_raw_p4_sheets
+import plotly.graph_objects as go
+from modules import lineage
+from modules.rawdata import default_file, load_raw_p4_sheets
+from modules.sheet_registry import memory_report
+from modules.trade_matrix import build_trade_matrix
 
-DEFAULT_FILE = "data/specialty-phosphates-market-outlook-database-february-2025-amended.xlsx"
+
+@st.cache_data(max_entries=2)
+def _trade_matrix(file_path, version):
+    matrix = build_trade_matrix(load_raw_p4_sheets(file_path))
+    lineage.note_built("trade_matrix", version, cru_file=file_path)
+    return matrix
+
+def load_trade_matrix(file_path):
+    return _trade_matrix(file_path, lineage.version("trade_matrix", cru_file=file_path))
+
+def trade_sankey_figure(matrix, year, top_n=25):
+    flows = matrix.year_slice(year)
+    exp_idx, imp_idx = flows.nonzero()
+    volumes = flows[exp_idx, imp_idx]
+    order = volumes.argsort()[::-1][:top_n]
+    exp_idx, imp_idx, volumes = exp_idx[order], imp_idx[order], volumes[order]
+
+    # Exporters and importers get separate nodes so two-way partners don't form loops
+    exporters = sorted(set(exp_idx.tolist()))
+    importers = sorted(set(imp_idx.tolist()))
+    exp_node = {c: i for i, c in enumerate(exporters)}
+    imp_node = {c: len(exporters) + i for i, c in enumerate(importers)}
+
+    fig = go.Figure(go.Sankey(
+        node=dict(
+            label=[matrix.countries[c] for c in exporters] + [matrix.countries[c] for c in importers],
+            color=["steelblue"] * len(exporters) + ["mediumturquoise"] * len(importers),
+            pad=12, thickness=14
+        ),
+        link=dict(
+            source=[exp_node[c] for c in exp_idx],
+            target=[imp_node[c] for c in imp_idx],
+            value=volumes.tolist()
+        )
+    ))
+    fig.update_layout(height=600, plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white")
+    return fig
 
 def show():
     st.header("📄 P4 Raw Data Viewer")
 
-    file_path = st.sidebar.text_input("Excel file name", value=DEFAULT_FILE)
+    file_path = st.sidebar.text_input("Excel file name", value=default_file())
 
     raw_data = load_raw_p4_sheets(file_path)
 
@@ -18,3 +58,38 @@ def show():
                 st.warning(df)
             else:
                 st.dataframe(df, use_container_width=True)
+
+    with st.expander("💾 Memory footprint (after compaction)"):
+        st.dataframe(memory_report(raw_data), use_container_width=True, hide_index=True)
+
+    # ------------------------------
+    # 🔀 Trade Flows (from precomputed exporter x importer matrices)
+    # ------------------------------
+    matrix = load_trade_matrix(file_path)
+    if not matrix.years:
+        st.warning("No P4 trade sheets available.")
+        return
+
+    st.subheader("🔀 P4 Trade Flows, '000 t product")
+    col_year, col_n = st.columns(2)
+    with col_year:
+        year = st.selectbox("📅 Trade year", matrix.years, index=len(matrix.years) - 1)
+    with col_n:
+        top_n = st.slider("🔢 Largest flows to show", 5, 100, 25)
+
+    st.plotly_chart(trade_sankey_figure(matrix, year, top_n), use_container_width=True)
+
+    col_net, col_partners = st.columns(2)
+    with col_net:
+        st.markdown("##### ⚖️ Net Flows by Country")
+        st.dataframe(matrix.net_flows(year), use_container_width=True, hide_index=True)
+    with col_partners:
+        country = st.selectbox("🌍 Country", matrix.countries, index=matrix.countries.index("China") if "China" in matrix.countries else 0)
+        st.markdown("##### 🚢 Top Export Destinations")
+        st.dataframe(matrix.top_partners(country, year, direction="exports"), use_container_width=True, hide_index=True)
+        st.markdown("##### 📦 Top Import Origins")
+        st.dataframe(matrix.top_partners(country, year, direction="imports"), use_container_width=True, hide_index=True)
+
+    st.markdown("##### 🗺️ Inter-regional Flows (exporting region → importing region)")
+    region_table = matrix.region_flows(year)
+    st.dataframe(region_table.style.format("{:,.1f}"), use_container_width=True)
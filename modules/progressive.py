@@ -0,0 +1,36 @@
+# modules/progressive.py
+#
+# Progressive page rendering. The expensive stages of a page (workbook loads,
+# cube building, figure generation) are submitted to a shared thread pool;
+# the script thread reserves an st.empty() slot for each result, renders the
+# cheap parts (tables, widgets) as soon as their inputs are ready and fills
+# the chart slots in completion order. Worker functions must not call st.*:
+# only the script thread creates Streamlit elements.
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import streamlit as st
+
+MAX_WORKERS = 4
+
+@st.cache_resource
+def executor():
+    """Thread pool shared by all sessions (bounded, so concurrent users queue)."""
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="p4-render")
+
+def submit(fn, *args, **kwargs):
+    return executor().submit(fn, *args, **kwargs)
+
+def wait_for(future, slot=None, message="Loading..."):
+    """Result of `future`, showing a spinner (inside `slot`, if given) while it runs."""
+    if future.done():
+        return future.result()
+    with (slot.container() if slot is not None else st.container()):
+        with st.spinner(message):
+            return future.result()
+
+def stream_charts(jobs):
+    """Fill each (slot, figure future) pair as soon as its figure is built."""
+    slots = {future: slot for slot, future in jobs}
+    for future in as_completed(slots):
+        slots[future].plotly_chart(future.result(), use_container_width=True)
@@ -0,0 +1,123 @@
+# modules/query_engine.py
+#
+# Read-only SQL over one parsed copy of both workbooks. The export tables are
+# materialized once to Parquet under data/cache/ and loaded into an in-process
+# DuckDB database, so notebooks and scripts don't re-parse the Excel files.
+# Besides facts / comparison / gaps, every registered sheet is a table of its
+# own (cru_p4_capacity_list, spg_p4_assetlist, cru_p4_2023_trade, ...).
+# The cache is rebuilt when its lineage version (modules/lineage.py) changes:
+#
+#   from modules.query_engine import query
+#   query("SELECT Country, SUM(Value) FROM facts WHERE Metric = 'Capacity' GROUP BY 1")
+#
+#   python -m modules.query_engine "SELECT * FROM gaps ORDER BY ABS(Delta) DESC LIMIT 10"
+
+import argparse
+import hashlib
+import json
+import os
+
+import duckdb
+import streamlit as st
+
+from modules import lineage
+from modules.export_api import load_export_tables, write_table
+from modules.compare_sources_module import workbook_files
+
+CACHE_DIR = "data/cache"
+
+def cache_folder(cru_file=None, spg_file=None, cache_dir=CACHE_DIR):
+    """Each workbook pair gets its own sub-directory."""
+    cru_file, spg_file = workbook_files(cru_file, spg_file)
+    key = hashlib.sha1(f"{os.path.abspath(cru_file)}|{os.path.abspath(spg_file)}".encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, key)
+
+def read_manifest(folder):
+    try:
+        with open(os.path.join(folder, "lineage.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def materialize(cru_file=None, spg_file=None, cache_dir=CACHE_DIR):
+    """Write the export tables to Parquet unless the cache was built from the current inputs.
+
+    Returns {table: Parquet path}: the facts / comparison / gaps datasets and
+    one table per registered sheet that loaded (export_api.SHEET_TABLES).
+
+    The cache directory holds a lineage.json manifest with the version and
+    input fingerprints it was built from; any changed workbook, constant or
+    builder (not just a newer file) triggers the rebuild.
+    """
+    cru_file, spg_file = workbook_files(cru_file, spg_file)
+    folder = cache_folder(cru_file, spg_file, cache_dir)
+    params = {"cru_file": cru_file, "spg_file": spg_file}
+    current = lineage.version("parquet_cache", **params)
+    manifest = read_manifest(folder)
+    if manifest.get("version") == current and manifest.get("tables"):
+        paths = {name: os.path.join(folder, f"{name}.parquet") for name in manifest["tables"]}
+        if all(os.path.exists(p) for p in paths.values()):
+            return paths
+
+    tables = load_export_tables(cru_file, spg_file)
+    paths = {name: os.path.join(folder, f"{name}.parquet") for name in tables}
+    os.makedirs(folder, exist_ok=True)
+    for name, path in paths.items():
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            write_table(tables[name], f)
+        os.replace(tmp_path, path)
+    with open(os.path.join(folder, "lineage.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": current, "tables": list(tables), "inputs": lineage.inputs("parquet_cache", **params)}, f, indent=2)
+    lineage.note_built("parquet_cache", current, **params)
+    return paths
+
+def stale_inputs(cru_file=None, spg_file=None, cache_dir=CACHE_DIR):
+    """Inputs that changed since the Parquet cache was written (everything if it was never written)."""
+    cru_file, spg_file = workbook_files(cru_file, spg_file)
+    recorded = read_manifest(cache_folder(cru_file, spg_file, cache_dir)).get("inputs", {})
+    return lineage.changed_inputs(recorded, "parquet_cache", cru_file=cru_file, spg_file=spg_file)
+
+@st.cache_resource(max_entries=2)
+def _connect(cru_file, spg_file, version):
+    """In-memory DuckDB database holding one table per dataset, locked read-only."""
+    paths = materialize(cru_file, spg_file)
+    con = duckdb.connect(":memory:")
+    for name, path in paths.items():
+        con.execute(f'CREATE TABLE "{name}" AS SELECT * FROM read_parquet(?)', [path])
+    # No file access from user queries once the tables are loaded
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    lineage.note_built("sql_tables", version, cru_file=cru_file, spg_file=spg_file)
+    return con
+
+def connect(cru_file=None, spg_file=None):
+    cru_file, spg_file = workbook_files(cru_file, spg_file)
+    return _connect(cru_file, spg_file, lineage.version("sql_tables", cru_file=cru_file, spg_file=spg_file))
+
+def query(sql, params=None, cru_file=None, spg_file=None):
+    """Run a read-only SELECT and return a DataFrame."""
+    con = connect(cru_file, spg_file)
+    statements = con.extract_statements(sql)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Only a single SELECT statement is allowed")
+    # A cursor per call so concurrent sessions don't share result state
+    return con.cursor().execute(sql, params).df()
+
+def list_tables(cru_file=None, spg_file=None):
+    return query(
+        "SELECT table_name, column_name, data_type FROM information_schema.columns ORDER BY table_name, ordinal_position",
+        cru_file=cru_file, spg_file=spg_file
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only SQL over the cached P4 datasets")
+    parser.add_argument("sql", nargs="?", help="SELECT statement; omit to list tables")
+    parser.add_argument("--cru-file")
+    parser.add_argument("--spg-file")
+    args = parser.parse_args()
+
+    if args.sql:
+        print(query(args.sql, cru_file=args.cru_file, spg_file=args.spg_file).to_string(index=False))
+    else:
+        print(list_tables(args.cru_file, args.spg_file).to_string(index=False))
@@ -1,9 +1,13 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from modules.raw_materials_data_module import load_raw_materials_data
+from modules.compare_sources_module import standardize_country_name
+from modules.dataset_view import build_views
+from modules.raw_materials_data_module import default_file, load_raw_materials_data
+from modules.scenario_module import scenario_selector
+from modules.sheet_registry import SPG, load_error
 
-DEFAULT_FILE = "data/PRawMaterials_Datafile_PIEC_2024M11.xlsx"
 
 METRICS = {
     "P4_Cap_O": "Capacity",
@@ -13,88 +17,123 @@ METRICS = {
     "P4_I": "Imports"
 }
 
-def extract_metric_row(df, region):
-    df = df.copy()
-    df.columns = df.columns.map(str)
-    year_cols = [col for col in df.columns if col.isdigit() and 2010 <= int(col) <= 2050]
-
-    region_col = [col for col in df.columns if "Geography" in col or "Region" in col][0]
-    match = df[df[region_col].astype(str).str.strip().str.lower() == region.lower()]
-
-    if not match.empty:
-        row = match.iloc[0][year_cols]
-        row.index = pd.Series(row.index).astype(int)
-        return pd.to_numeric(row, errors="coerce")
-    return pd.Series([None] * len(year_cols), index=pd.Series(year_cols).astype(int))
-
-def show():
-    st.header("📊 Raw Materials – P4 S&P Global Analysis")
-
-    file_path = st.text_input("Excel file name", value=DEFAULT_FILE)
-    raw_data = load_raw_materials_data(file_path)
-
-    region = st.selectbox("🌍 Select region for summary (from Geography column)", ["Global", "China (mainland)", "United States", "Europe"])
-    end_year = st.slider("📅 Select last year to show", 2020, 2050, 2030)
-
+def extract_regions(view, countries=True):
+    """Geography names of a S&D sheet: Global, the regions and their sub-regions
+    (the aggregate rows), then optionally the countries; in sheet order and
+    mapped through standardize_country_name."""
+    names = ["Global"] + [r for r in view.keys["Region"] if r is not None] + [r for r in view.keys["Sub-region"] if r is not None]
+    if countries:
+        is_country = np.array([r is not None and r != "Global" for r in view.keys["Region"]], dtype=bool)
+        names += list(view.keys["Geography"][is_country])
+    return list(dict.fromkeys(standardize_country_name(n) for n in names if n is not None))
+
+def region_options(views, countries=True):
+    """Geography names of P4_Cap_O with a non-zero value in some METRICS sheet.
+
+    The summary selectbox offers them all; the report pack renders the
+    aggregate rows only (countries=False).
+    """
+    if "P4_Cap_O" not in views:
+        return []
+    with_data = set()
+    for sheet in METRICS:
+        view = views.get(sheet)
+        if view is not None:
+            sums = view.group_sum("Geography", 2010, 2050, standardize=standardize_country_name)
+            with_data |= {name.lower() for name in sums.index[(sums.abs() > 0).any(axis=1)]}
+    return [region for region in extract_regions(views["P4_Cap_O"], countries) if region.lower() in with_data]
+
+def extract_metric_row(view, region):
+    return view.row("Geography", standardize_country_name(region), 2010, 2050, case_sensitive=False, standardize=standardize_country_name)
+
+def summary_table(views, region):
+    """Metric x year table of one Geography row per METRICS sheet."""
     summary_data = {}
     for sheet, metric in METRICS.items():
-        df = raw_data.get(sheet)
-        if isinstance(df, pd.DataFrame):
-            row = extract_metric_row(df, region)
+        view = views.get(sheet)
+        if view is not None:
+            row = extract_metric_row(view, region)
             summary_data[metric] = row
 
     summary_df = pd.DataFrame.from_dict(summary_data, orient="index")
     summary_df.index.name = "Metric"
     summary_df.columns.name = "Year"
-    summary_df = summary_df.sort_index(axis=1)
-
-    st.dataframe(summary_df.style.format(lambda x: f"{x:,.0f}" if pd.notnull(x) else ""), use_container_width=True)
+    return summary_df.sort_index(axis=1)
 
-    # Charts
+def chart_years(summary_df, end_year):
     years = summary_df.columns.astype(int)
-    years = years[years <= end_year]
+    return years[years <= end_year]
 
+def supply_figure(summary_df, end_year):
+    years = chart_years(summary_df, end_year)
     fig_supply = go.Figure()
     fig_supply.add_trace(go.Bar(x=years, y=summary_df.loc["Capacity", years], name="Capacity", marker_color="lightsteelblue"))
     fig_supply.add_trace(go.Bar(x=years, y=summary_df.loc["Production", years], name="Production", marker_color="steelblue"))
     fig_supply.add_trace(go.Scatter(x=years, y=summary_df.loc["Exports", years], name="Exports", mode="lines+markers", line=dict(color="white"), marker=dict(color="black", size=6, line=dict(width=2, color="white"))))
     fig_supply.update_layout(barmode="overlay", plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white", height=400)
+    return fig_supply
 
+def demand_figure(summary_df, end_year):
+    years = chart_years(summary_df, end_year)
     fig_demand = go.Figure()
     fig_demand.add_trace(go.Bar(x=years, y=summary_df.loc["Demand", years], name="Demand", marker_color="mediumturquoise"))
     fig_demand.add_trace(go.Scatter(x=years, y=summary_df.loc["Imports", years], name="Imports", mode="lines+markers", line=dict(color="white"), marker=dict(color="black", size=6, line=dict(width=2, color="white"))))
     fig_demand.update_layout(barmode="stack", plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white", height=400)
+    return fig_demand
+
+def show():
+    st.header("📊 Raw Materials – P4 S&P Global Analysis")
+
+    file_path = st.text_input("Excel file name", value=default_file())
+    raw_data = load_raw_materials_data(file_path)
+    views = build_views(raw_data, SPG)
+
+    region = st.selectbox("🌍 Select region for summary (from Geography column)", region_options(views))
+    end_year = st.slider("📅 Select last year to show", 2020, 2050, 2030)
+
+    summary_df = summary_table(views, region)
+
+    st.dataframe(summary_df.style.format(lambda x: f"{x:,.0f}" if pd.notnull(x) else ""), use_container_width=True)
 
+    # Charts
     col1, col2 = st.columns(2)
     with col1:
         st.markdown(f"##### 📈 {region} Supply, kt/y P4")
-        st.plotly_chart(fig_supply, use_container_width=True)
+        st.plotly_chart(supply_figure(summary_df, end_year), use_container_width=True)
     with col2:
         st.markdown(f"##### 📈 {region} Demand, kt/y P4")
-        st.plotly_chart(fig_demand, use_container_width=True)
+        st.plotly_chart(demand_figure(summary_df, end_year), use_container_width=True)
+
+    # --- Every region in one static HTML file ---
+    from modules.report_pack import show_report_panel
+    with st.expander("🗂️ Report Pack (all regions, HTML)"):
+        show_report_panel(end_year)
 
     # Pareto Chart by Country (P4_Cap_O)
     st.subheader("📊 Pareto Chart: Capacity by Country")
-    df_cap = raw_data.get("P4_Cap_O")
-    if isinstance(df_cap, pd.DataFrame):
-        df_cap.columns = df_cap.columns.map(str)
-        year_col = str(end_year)
-
+    cap_view = views.get("P4_Cap_O")
+    if cap_view is None:
+        st.warning(load_error(raw_data, "P4_Cap_O"))
+    else:
         top_n = st.selectbox("🔢 Number of countries to display", options=[5, 10, 15, 20, "All"], index=1)
 
-        df_pareto = df_cap[["Geography", year_col]].copy()
-        df_pareto = df_pareto.rename(columns={"Geography": "Country", year_col: "Capacity"})
-        df_pareto["Capacity"] = pd.to_numeric(df_pareto["Capacity"], errors="coerce")
-        df_pareto = df_pareto.dropna(subset=["Country", "Capacity"])
+        df_pareto = cap_view.year_table("Geography", end_year, value_name="Capacity")
+        df_pareto = df_pareto.rename(columns={"Geography": "Country"})
 
         # Extract Global for KPI display
         global_row = df_pareto[df_pareto["Country"].str.strip().str.lower() == "global"]
         global_capacity = global_row["Capacity"].sum() if not global_row.empty else 0
         st.markdown(f"### 🌐 Global Capacity in {end_year}: **{global_capacity:,.0f} kt/y**")
 
+        # What-if: the scenario's net asset-level change added to the Global row
+        engine, scenario = scenario_selector("🧪 Scenario for the Global KPI", key="analysis_scenario")
+        if engine is not None:
+            change = engine.net_change(SPG, scenario).get(end_year, 0.0)
+            st.markdown(f"#### 🧪 {scenario.name}: **{global_capacity + change:,.0f} kt/y** ({change:+,.0f} vs base)")
+
         df_pareto = df_pareto[df_pareto["Country"].str.strip().str.lower() != "global"]
 
-        df_country = df_pareto.groupby("Country", as_index=False)["Capacity"].sum()
+        df_country = df_pareto.groupby("Country", as_index=False, observed=True)["Capacity"].sum()
         df_country = df_country.sort_values("Capacity", ascending=False)
 
         if top_n != "All":
@@ -112,29 +151,18 @@ def show():
     # Capacity Evolution Over Time by Region (Filtered Geography column + Global)
     st.subheader("📈 Capacity Evolution Over Time by Region (including Global)")
     
-    if isinstance(df_cap, pd.DataFrame):
-        df_cap.columns = df_cap.columns.map(str)
-        year_cols = [col for col in df_cap.columns if col.isdigit() and 2010 <= int(col) <= end_year]
-    
+    if cap_view is not None:
         valid_regions = [
             "Europe", "Eurasia", "Africa", "Middle East",
             "Asia", "Oceania", "Americas", "Antarctica", "Undefined", "Global"
         ]
     
-        if "Geography" in df_cap.columns:
-            df_filtered = df_cap[df_cap["Geography"].isin(valid_regions)]
-        else:
-            st.warning("Column 'Geography' not found in P4_Cap_O.")
-            df_filtered = pd.DataFrame()
-    
-        if not df_filtered.empty:
-            df_long = df_filtered[["Geography"] + year_cols].copy()
-            df_long = df_long.melt(id_vars="Geography", var_name="Year", value_name="Capacity")
-            df_long["Capacity"] = pd.to_numeric(df_long["Capacity"], errors="coerce")
-            df_long = df_long.dropna(subset=["Capacity"])
-            df_long["Year"] = df_long["Year"].astype(int)
+        region_rows = np.isin(cap_view.keys["Geography"], valid_regions)
     
-            df_grouped = df_long.groupby(["Geography", "Year"], as_index=False)["Capacity"].sum()
+        if region_rows.any():
+            df_grouped = cap_view.group_sum("Geography", 2010, end_year, rows=region_rows, min_count=1)
+            df_grouped = df_grouped.melt(ignore_index=False, var_name="Year", value_name="Capacity").reset_index()
+            df_grouped = df_grouped.dropna(subset=["Capacity"])
     
             fig_lines = go.Figure()
             for region in valid_regions:
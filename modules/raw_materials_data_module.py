@@ -1,52 +1,29 @@
+import os
 import streamlit as st
-import pandas as pd
+from modules.sheet_registry import SPG, load_sheets, memory_report, plan_for, sheets_for
 
 # Constants
-DEFAULT_FILE = "data/PRawMaterials_Datafile_PIEC_2024M11.xlsx"
-P4_SHEETS_RAW_MATERIALS = [
-    "P4__AssetList",
-    "P4_Cap_O",
-    "P4_Cap_H",
-    "P4_UR",
-    "P4_P",
-    "P4_I",
-    "P4_E",
-    "P4_D"
-]
-
-# Header rows: specific per sheet
-HEADER_ROWS = {
-    "P4__AssetList": 6,
-    "P4_Cap_O": 8,
-    "P4_Cap_H": 8,
-    "P4_UR": 8,
-    "P4_P": 8,
-    "P4_I": 8,
-    "P4_E": 8,
-    "P4_D": 8
-}
+BUNDLED_FILE = "data/PRawMaterials_Datafile_PIEC_2024M11.xlsx"
+P4_SHEETS_RAW_MATERIALS = sheets_for(SPG)
+
+# Header rows: specific per sheet (registered in modules/sheet_registry.py)
+HEADER_ROWS = {sheet: plan_for(SPG, sheet).header_row for sheet in P4_SHEETS_RAW_MATERIALS}
+
+def default_file():
+    """S&P Global workbook the app opens. P4_SPG_FILE points every S&P Global
+    page at another workbook; it is read at call time."""
+    return os.environ.get("P4_SPG_FILE", BUNDLED_FILE)
 
 def load_raw_materials_data(file_path):
     try:
-        xl = pd.ExcelFile(file_path)
-        data = {}
-        for sheet in P4_SHEETS_RAW_MATERIALS:
-            if sheet not in xl.sheet_names:
-                data[sheet] = f"Sheet '{sheet}' not found"
-                continue
-
-            header_row = HEADER_ROWS.get(sheet, 0)
-            df = xl.parse(sheet, header=header_row)
-            data[sheet] = df
-
-        return data
+        return load_sheets(file_path, SPG)
     except Exception as e:
         return {"error": str(e)}
 
 def show():
     st.header("📄 Raw Materials Data Viewer")
 
-    file_path = st.sidebar.text_input("Excel file name", value=DEFAULT_FILE)
+    file_path = st.sidebar.text_input("Excel file name", value=default_file())
 
     raw_data = load_raw_materials_data(file_path)
 
@@ -56,3 +33,6 @@ def show():
                 st.warning(df)
             else:
                 st.dataframe(df, use_container_width=True)
+
+    with st.expander("💾 Memory footprint (after compaction)"):
+        st.dataframe(memory_report(raw_data), use_container_width=True, hide_index=True)
@@ -1,34 +1,19 @@
-import pandas as pd
+import os
 
-P4_SHEETS = [
-    "P4 Capacity list",
-    "P4 Capacity",
-    "P4 Production",
-    "P4 Demand",
-    "P4 Imports",
-    "P4 Exports",
-    "P4 2021 Trade",
-    "P4 2022 Trade",
-    "P4 2023  Trade"
-]
+from modules.sheet_registry import CRU, load_sheets, sheets_for
 
-def load_raw_p4_sheets(file_path):
-    try:
-        xl = pd.ExcelFile(file_path)
-        data = {}
-        for sheet in P4_SHEETS:
-            if sheet not in xl.sheet_names:
-                data[sheet] = f"Sheet '{sheet}' not found"
-                continue
+BUNDLED_FILE = "data/specialty-phosphates-market-outlook-database-february-2025-amended.xlsx"
 
-            # Only "P4 Capacity List" uses row 4 (index 3) as header
-            if sheet == "P4 Capacity list":
-                df = xl.parse(sheet, header=3)
-            else:
-                df = xl.parse(sheet, header=2)
+def default_file():
+    """CRU workbook the app opens. P4_CRU_FILE points every CRU page at another
+    workbook (e.g. one from benchmarks/synthetic.py); it is read at call time."""
+    return os.environ.get("P4_CRU_FILE", BUNDLED_FILE)
 
-            data[sheet] = df
+P4_SHEETS = sheets_for(CRU)
 
-        return data
+def load_raw_p4_sheets(file_path):
+    try:
+        # Header rows and key columns per sheet live in modules/sheet_registry.py
+        return load_sheets(file_path, CRU)
     except Exception as e:
         return {"error": str(e)}
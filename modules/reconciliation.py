@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+def capacity_matrix(view, country_col, years, standardize=None, rows=None):
+    """Country x year capacity table (float64) from a SheetView of an asset/capacity list."""
+    years = list(years)
+    values = view.group_sum(country_col, years[0], years[-1], standardize, rows=rows, min_count=1)
+    values = values.reindex(columns=years)
+    values.index.name = "Country"
+    return values
+
+def align_sources(cru, spg):
+    """Reindex both country x year tables onto the union of countries and years."""
+    countries = cru.index.union(spg.index)
+    years = cru.columns.union(spg.columns)
+    return cru.reindex(index=countries, columns=years), spg.reindex(index=countries, columns=years)
+
+def region_groups(view, group_col, country_col, standardize=None, prefix=""):
+    """{prefix + group: [countries]} from a view's group and country key columns.
+
+    Rows with a blank group or country (subtotal and total rows) are skipped.
+    """
+    groups = {}
+    for group, country in zip(view.keys[group_col], view.key(country_col, standardize)):
+        if group is not None and country is not None:
+            groups.setdefault(prefix + group, []).append(country)
+    return {name: sorted(set(members)) for name, members in groups.items()}
+
+def group_targets(cru, spg, weight, groups):
+    """Blended group totals (group x year) of two aligned country x year tables.
+
+    Both totals are summed from the tables being reconciled, so the targets
+    come from the same sheets as the country values; a country covered by
+    one source only counts with that source's weight.
+    """
+    rows = {}
+    for name, members in groups.items():
+        members = [c for c in members if c in cru.index]
+        rows[name] = weight * spg.loc[members].sum() + (1 - weight) * cru.loc[members].sum()
+    return pd.DataFrame.from_dict(rows, orient="index").reindex(columns=cru.columns)
+
+def constraint_matrix(countries, groups):
+    """0/1 membership matrix (groups x countries) from {group: [countries]}."""
+    pos = {c: i for i, c in enumerate(countries)}
+    a = np.zeros((len(groups), len(countries)))
+    for k, members in enumerate(groups.values()):
+        idx = [pos[c] for c in members if c in pos]
+        a[k, idx] = 1.0
+    return a
+
+def reconcile(cru, spg, weight=0.5, groups=None, targets=None):
+    """Blend two aligned country x year tables into a house view.
+
+    The unconstrained view is `weight * spg + (1 - weight) * cru`, with a
+    country falling back to whichever source covers it. When `groups`
+    ({name: [countries]}) and `targets` (group x year DataFrame) are given,
+    the blend is adjusted so each group sums to its target: every year is a
+    weighted minimum-norm correction x = b + W A' (A W A')^+ (t - A b) with
+    W = diag(|b|), so adjustments are spread pro rata to each country's size;
+    a group whose blend is all zero in a year is spread uniformly over its
+    members instead. All years are solved in one batched call.
+
+    Raises ValueError when a group with a non-zero target has no countries.
+    """
+    cru_v = cru.to_numpy(dtype=np.float64)
+    spg_v = spg.to_numpy(dtype=np.float64)
+
+    blend = weight * spg_v + (1 - weight) * cru_v
+    blend = np.where(np.isnan(cru_v), spg_v, blend)
+    blend = np.where(np.isnan(spg_v), cru_v, blend)
+    blend = np.nan_to_num(blend)
+
+    if groups:
+        a = constraint_matrix(cru.index, groups)
+        t = targets.reindex(index=list(groups), columns=cru.columns).to_numpy(dtype=np.float64)
+        # Groups without a published target for a year are left as blended
+        has_target = ~np.isnan(t)
+        empty = a.sum(axis=1) == 0
+        if (empty[:, None] & has_target & (np.nan_to_num(t) != 0)).any():
+            missing = [name for name, e in zip(groups, empty) if e]
+            raise ValueError(f"No countries in constrained group(s) {missing}")
+        residual = np.where(has_target, np.nan_to_num(t) - a @ blend, 0.0)
+
+        w = np.abs(blend).T  # (years, countries)
+        # Groups with nothing to scale in a year get uniform weights on their members
+        zero_weight = ((w @ a.T) == 0) & has_target.T  # (years, groups)
+        w = w + zero_weight.astype(np.float64) @ a
+        awa = np.einsum("kc,yc,jc->ykj", a, w, a)
+        awa = awa * (has_target.T[:, :, None] & has_target.T[:, None, :])
+        lam = np.einsum("ykj,jy->ky", np.linalg.pinv(awa), residual)
+        blend = blend + w.T * (a.T @ lam)
+
+    return pd.DataFrame(blend, index=cru.index, columns=cru.columns)
+
+def reconciliation_table(cru, spg, house):
+    """Long table with the raw sources next to the reconciled series."""
+    countries = np.repeat(cru.index.to_numpy(), len(cru.columns))
+    years = np.tile(cru.columns.to_numpy(), len(cru.index))
+    return pd.DataFrame({
+        "Country": countries,
+        "Year": years,
+        "CRU": cru.to_numpy().ravel(),
+        "S&P Global": spg.to_numpy().ravel(),
+        "House View": house.to_numpy().ravel()
+    })
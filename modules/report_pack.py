@@ -0,0 +1,192 @@
+# modules/report_pack.py
+#
+# Monthly report pack: the S&D summary table and the supply / demand charts
+# of every region offered by the P4 Supply&Demand (CRU) and Raw Materials
+# Analytics (S&P Global) pages, in one static HTML file. Both workbooks are
+# parsed once and the region sections are rendered by a worker pool sharing
+# that dataset: forked processes on the command line, the app's thread pool
+# inside Streamlit, where plotly figure serialization holds the GIL and the
+# charts render about one at a time. No browser is needed to build it; the
+# file opens offline and prints one region per page (print to PDF from any
+# viewer).
+#
+#   python -m modules.report_pack --out reports/p4_pack.html --workers 4
+
+import argparse
+import html
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import plotly
+import plotly.offline
+import streamlit as st
+
+from modules import lineage
+from modules import raw_materials_analysis_module as spg_page
+from modules import supply_demand_module as cru_page
+from modules.dataset_view import build_views
+from modules.progressive import executor
+from modules.compare_sources_module import workbook_files
+from modules.raw_materials_data_module import load_raw_materials_data
+from modules.rawdata import load_raw_p4_sheets
+from modules.sheet_registry import CRU, SPG
+
+UNITS = {CRU: "'000 t/y P4", SPG: "kt/y P4"}
+
+PACK_CSS = """
+body { background: #0e1117; color: #fafafa; font-family: sans-serif; margin: 24px; }
+a { color: #8ab4f8; }
+table { border-collapse: collapse; font-size: 12px; margin: 8px 0 16px; }
+th, td { border: 1px solid #30343c; padding: 3px 6px; text-align: right; }
+th { background: #1c1f26; }
+.table-wrap { overflow-x: auto; }
+.charts { display: flex; gap: 16px; }
+.chart { flex: 1; min-width: 0; }
+section { page-break-before: always; }
+@media print { .table-wrap { overflow: visible; } table { font-size: 8px; } }
+"""
+
+# Dataset of the process pool's workers: set once per worker by its initializer
+_dataset = None
+
+def _share(dataset):
+    global _dataset
+    _dataset = dataset
+
+def load_dataset(cru_file=None, spg_file=None):
+    """SheetViews of both workbooks, keyed by source."""
+    cru_file, spg_file = workbook_files(cru_file, spg_file)
+    return {
+        CRU: build_views(load_raw_p4_sheets(cru_file), CRU),
+        SPG: build_views(load_raw_materials_data(spg_file), SPG)
+    }
+
+def has_data(summary_df):
+    return bool((summary_df.fillna(0) != 0).to_numpy().any())
+
+def pack_regions(dataset):
+    """(source, region) pairs in pack order: the regions each page offers.
+
+    Label-only rows (a region heading without figures) would render as an
+    empty table and blank charts, so regions without any data are left out.
+    """
+    sections = []
+    if "P4 Capacity" in dataset[CRU]:
+        regions = cru_page.extract_level1_regions(dataset[CRU]["P4 Capacity"])
+        regions = ["World Total"] + [region for region in regions if region != "World Total"]
+        sections += [(CRU, region) for region in regions if has_data(cru_page.summary_table(dataset[CRU], region))]
+    sections += [(SPG, region) for region in spg_page.region_options(dataset[SPG], countries=False)]
+    return sections
+
+def section_id(source, region):
+    return "".join(c if c.isalnum() else "-" for c in f"{source}-{region}").lower()
+
+def render_section(source, region, end_year, dataset=None):
+    """HTML of one region: summary table and supply / demand charts."""
+    views = (dataset if dataset is not None else _dataset)[source]
+    if source == CRU:
+        summary_df = cru_page.summary_table(views, region)
+        figures = [cru_page.supply_figure(summary_df), cru_page.demand_figure(summary_df)]
+    else:
+        summary_df = spg_page.summary_table(views, region)
+        figures = [spg_page.supply_figure(summary_df, end_year), spg_page.demand_figure(summary_df, end_year)]
+
+    table = summary_df.to_html(float_format=lambda x: f"{x:,.0f}", na_rep="", border=0)
+    charts = "".join(
+        f'<div class="chart"><h4>{html.escape(title)}, {UNITS[source]}</h4>'
+        f'{fig.to_html(full_html=False, include_plotlyjs=False)}</div>'
+        for title, fig in zip(["Supply", "Demand"], figures)
+    )
+    return (
+        f'<section id="{section_id(source, region)}"><h2>{html.escape(region)} ({html.escape(source)})</h2>'
+        f'<div class="table-wrap">{table}</div><div class="charts">{charts}</div></section>'
+    )
+
+def render_sections(dataset, sections, end_year, workers=1, pool=None):
+    """Render sections in order; on `pool` (threads sharing `dataset`) or `workers` processes.
+
+    Threads mostly overlap the table work: figure serialization is GIL-bound,
+    so only processes render charts in parallel.
+    """
+    if pool is not None:
+        jobs = [pool.submit(render_section, source, region, end_year, dataset) for source, region in sections]
+        return [job.result() for job in jobs]
+    if workers <= 1:
+        return [render_section(source, region, end_year, dataset) for source, region in sections]
+    # Forked workers inherit the parsed dataset; spawned ones receive it once each
+    with ProcessPoolExecutor(workers, initializer=_share, initargs=(dataset,)) as processes:
+        sources, regions = zip(*sections)
+        return list(processes.map(render_section, sources, regions, [end_year] * len(sections)))
+
+def build_pack(dataset, end_year=2030, workers=1, pool=None, plotlyjs="inline", files=None):
+    """Complete report pack as one HTML string; `files` ({source: workbook path}) are listed under the title."""
+    sections = pack_regions(dataset)
+    body = render_sections(dataset, sections, end_year, workers, pool)
+
+    if plotlyjs == "inline":
+        script = f"<script>{plotly.offline.get_plotlyjs()}</script>"
+    else:
+        script = f'<script src="https://cdn.plot.ly/plotly-{plotly.offline.get_plotlyjs_version()}.min.js"></script>'
+
+    toc = "".join(
+        f'<li><a href="#{section_id(source, region)}">{html.escape(region)} ({html.escape(source)})</a></li>'
+        for source, region in sections
+    )
+    generated = datetime.now().strftime("%Y-%m-%d %H:%M")
+    workbooks = "".join(f"<li>{html.escape(source)}: {html.escape(os.path.basename(path))}</li>" for source, path in (files or {}).items())
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>P4 Market Report Pack {generated}</title>'
+        f"<style>{PACK_CSS}</style>{script}</head><body>"
+        f"<h1>P4 Market Report Pack</h1><p>Generated {generated}; S&P Global charts up to {end_year}.</p>"
+        f"<ul>{workbooks}</ul><h3>Contents</h3><ol>{toc}</ol>{''.join(body)}</body></html>"
+    )
+
+@st.cache_resource(max_entries=2)
+def load_shared_dataset(cru_file, spg_file, version):
+    dataset = load_dataset(cru_file, spg_file)
+    lineage.note_built("report_dataset", version, cru_file=cru_file, spg_file=spg_file)
+    return dataset
+
+def show_report_panel(end_year=2030):
+    """Build the pack for the app's workbooks and offer it as a download."""
+    st.caption("Summary table and supply / demand charts for every region of both sources, in one offline HTML file. "
+               "Charts render on the app's thread pool, roughly one at a time; "
+               "`python -m modules.report_pack --workers N` renders them in parallel processes.")
+    if not st.button("🗂️ Build report pack"):
+        return
+    with st.spinner("Rendering all regions..."):
+        t = time.perf_counter()
+        cru_file, spg_file = workbook_files()
+        dataset = load_shared_dataset(cru_file, spg_file, lineage.version("report_dataset", cru_file=cru_file, spg_file=spg_file))
+        pack = build_pack(dataset, end_year, pool=executor(), files={CRU: cru_file, SPG: spg_file})
+    st.success(f"{len(pack_regions(dataset))} regions rendered in {time.perf_counter() - t:.1f} s")
+    st.download_button(
+        label="📥 Download Report Pack (HTML)",
+        data=pack,
+        file_name=f"p4_report_pack_{datetime.now():%Y-%m}.html",
+        mime="text/html"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render every region's S&D summary and charts into one HTML file")
+    parser.add_argument("--out", default="reports/p4_report_pack.html")
+    parser.add_argument("--cru-file")
+    parser.add_argument("--spg-file")
+    parser.add_argument("--end-year", type=int, default=2030, help="last year of the S&P Global charts")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="rendering processes (1 renders inline)")
+    parser.add_argument("--plotlyjs", choices=["inline", "cdn"], default="inline", help="embed plotly.js (offline) or link the CDN")
+    args = parser.parse_args()
+
+    cru_file, spg_file = workbook_files(args.cru_file, args.spg_file)
+    t = time.perf_counter()
+    dataset = load_dataset(cru_file, spg_file)
+    t_load = time.perf_counter() - t
+    pack = build_pack(dataset, args.end_year, args.workers, plotlyjs=args.plotlyjs,
+                      files={CRU: cru_file, SPG: spg_file})
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(pack)
+    print(f"{len(pack_regions(dataset))} regions -> {args.out} ({len(pack) / 2**20:.1f} MB): "
+          f"load {t_load:.1f} s, render {time.perf_counter() - t - t_load:.1f} s with {args.workers} worker(s)")
@@ -0,0 +1,192 @@
+# modules/scenario_module.py
+
+import streamlit as st
+import numpy as np
+import plotly.graph_objects as go
+from modules import lineage
+from modules.compare_sources_module import CRU_SHEET, SPG_SHEET, standardize_country_name, workbook_files
+from modules.dataset_view import build_views
+from modules.rawdata import load_raw_p4_sheets
+from modules.raw_materials_data_module import load_raw_materials_data
+from modules.scenarios import BASE, COUNTRY_COLUMN, Closure, Scale, Scenario, ScenarioEngine, Shift, validate_name
+from modules.sheet_registry import CRU, SPG, load_error
+
+EDIT_TYPES = ["Closure", "Delay / bring forward", "Scale"]
+
+@st.cache_resource(max_entries=2)
+def load_scenario_engine(cru_file, spg_file, version):
+    """Base views and aggregates of both asset lists, parsed once and shared by every session and scenario.
+
+    Returns the loaders' messages as a string when a required sheet did not load.
+    """
+    cru_sheets = load_raw_p4_sheets(cru_file)
+    spg_sheets = load_raw_materials_data(spg_file)
+    cru_views = build_views(cru_sheets, CRU)
+    spg_views = build_views(spg_sheets, SPG)
+    cru_assets = cru_views.get(CRU_SHEET)
+    spg_assets = spg_views.get(SPG_SHEET)
+    spg_cap = spg_views.get("P4_Cap_O")
+    required = [(cru_assets, cru_sheets, CRU_SHEET), (spg_assets, spg_sheets, SPG_SHEET), (spg_cap, spg_sheets, "P4_Cap_O")]
+    errors = [load_error(sheets, sheet) for view, sheets, sheet in required if view is None]
+    if errors:
+        return "  \n".join(errors)
+
+    totals = {
+        CRU: cru_assets.row("Region", "World").astype(float),
+        SPG: spg_cap.row("Geography", "Global", case_sensitive=False).astype(float)
+    }
+    lineage.note_built("scenario_engine", version, cru_file=cru_file, spg_file=spg_file)
+    return ScenarioEngine({CRU: cru_assets, SPG: spg_assets}, totals, standardize_country_name)
+
+def current_engine():
+    """Scenario engine of the app's workbooks, rebuilt when any of its inputs changes."""
+    cru_file, spg_file = workbook_files()
+    return load_scenario_engine(cru_file, spg_file, lineage.version("scenario_engine", cru_file=cru_file, spg_file=spg_file))
+
+def saved_scenarios():
+    """This session's scenarios by name (the base case is implicit)."""
+    return st.session_state.setdefault("scenarios", {})
+
+def scenario_selector(label="🧪 Scenario", key=None):
+    """Pick one of the saved scenarios.
+
+    Returns (engine, scenario), or (None, BASE) when there are no saved
+    scenarios or the base case is selected, so callers keep their own path.
+    """
+    scenarios = saved_scenarios()
+    if not scenarios:
+        return None, BASE
+    name = st.selectbox(label, [BASE.name] + list(scenarios), key=key)
+    engine = current_engine() if name != BASE.name else None
+    if isinstance(engine, str):
+        st.warning(engine)
+    if not isinstance(engine, ScenarioEngine):
+        return None, BASE
+    return engine, scenarios[name]
+
+def kpi_figure(engine, scenarios, first, last):
+    fig = go.Figure()
+    for scenario in scenarios:
+        total = engine.total(SPG, scenario).loc[first:last]
+        is_base = scenario is BASE
+        fig.add_trace(go.Scatter(
+            x=total.index, y=total.values, mode="lines+markers", name=scenario.name,
+            line=dict(width=3 if is_base else 1.5, color="crimson" if is_base else None, dash="dash" if is_base else None)
+        ))
+    fig.update_layout(
+        height=400,
+        xaxis_title="Year",
+        yaxis_title="Capacity (kt/y)",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        font_color="white",
+        legend_title="Scenario"
+    )
+    return fig
+
+def gap_figure(df_gaps):
+    fig = go.Figure()
+    for name in df_gaps.columns:
+        fig.add_trace(go.Bar(x=df_gaps.index, y=df_gaps[name], name=name))
+    fig.update_layout(
+        barmode="group",
+        height=400,
+        xaxis_title="Country",
+        yaxis_title="Gap S&P Global - CRU (kt/y)",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        font_color="white",
+        legend_title="Scenario"
+    )
+    return fig
+
+def show():
+    st.header("🧪 Capacity Scenarios: What-If on the Asset Lists")
+
+    engine = current_engine()
+    if isinstance(engine, str):
+        st.error(engine)
+        return
+    scenarios = saved_scenarios()
+
+    # -----------------------
+    # 🛠️ Scenario builder
+    # -----------------------
+    st.subheader("🛠️ Build a Scenario")
+    col_name, col_source = st.columns(2)
+    name = col_name.text_input("Scenario name", value="My scenario")
+    source = col_source.radio("Source", [CRU, SPG], horizontal=True)
+
+    view = engine.assets[source]
+    country_col = COUNTRY_COLUMN[source]
+    col_country, col_company, col_status = st.columns(3)
+    country = col_country.selectbox("🌍 Country", ["All"] + view.unique(country_col))
+    in_country = view.mask(country_col, country) if country != "All" else np.ones(len(view), dtype=bool)
+    companies = sorted({c for c in view.keys["Company"][in_country] if c is not None})
+    company = col_company.selectbox("🏭 Company", ["All"] + companies)
+    status = col_status.selectbox("🚦 Status", ["All"] + view.unique("Status"))
+
+    match = tuple((col, value) for col, value in ((country_col, country), ("Company", company), ("Status", status)) if value != "All")
+    st.caption(f"{engine.matching_assets(source, match)} matching assets in the {source} asset list")
+
+    first, last = int(view.years[0]), int(view.years[-1])
+    edit_type = st.selectbox("✏️ Edit", EDIT_TYPES)
+    if edit_type == "Closure":
+        year = st.slider("📅 Closed from", first, last, min(2026, last))
+        edit = Closure(source, match, year)
+    elif edit_type == "Delay / bring forward":
+        years = st.slider("⏩ Years to shift (negative brings forward)", -5, 5, 2)
+        edit = Shift(source, match, years)
+    else:
+        factor = st.number_input("✖️ Capacity factor", min_value=0.0, max_value=5.0, value=0.5, step=0.05)
+        span = st.slider("📅 Years", first, last, (min(2025, last), last))
+        edit = Scale(source, match, factor, *span)
+
+    if st.button("➕ Add edit to scenario"):
+        try:
+            name = validate_name(name)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            scenarios[name] = scenarios.get(name, Scenario(name)).with_edit(edit)
+            st.success(f"Added to '{name}': {edit.describe()}")
+
+    if scenarios:
+        st.markdown("##### 📋 Saved Scenarios")
+        for scenario_name, scenario in list(scenarios.items()):
+            col_text, col_delete = st.columns([9, 1])
+            with col_text:
+                st.markdown(f"**{scenario_name}**  \n" + "  \n".join(f"• {edit.describe()}" for edit in scenario.edits))
+            with col_delete:
+                if st.button("X", key=f"delete_scenario_{scenario_name}"):
+                    del scenarios[scenario_name]
+                    st.rerun()
+
+    # -----------------------
+    # 🆚 Side-by-side comparison
+    # -----------------------
+    st.subheader("🆚 Scenarios Side by Side")
+    if not scenarios:
+        st.info("No scenarios yet. Add an edit above to create one.")
+        return
+
+    selected = st.multiselect("Scenarios to compare", list(scenarios), default=list(scenarios))
+    year = st.slider("📅 Comparison year", engine.years[0], engine.years[-1], 2026)
+    compared = [BASE] + [scenarios[n] for n in selected]
+
+    summary = engine.compare(compared, year)
+    summary["Δ S&P Global KPI vs Base"] = summary["S&P Global KPI"] - summary.loc[BASE.name, "S&P Global KPI"]
+    summary["Δ Gap vs Base"] = summary["Gap (S&P - CRU)"] - summary.loc[BASE.name, "Gap (S&P - CRU)"]
+    st.dataframe(summary.style.format("{:,.0f}"), use_container_width=True)
+
+    st.markdown("##### 🌐 S&P Global Capacity KPI by Scenario")
+    st.plotly_chart(kpi_figure(engine, compared, engine.years[0], 2050), use_container_width=True)
+
+    st.markdown(f"##### 📊 Gap by Country in {year} (S&P Global - CRU)")
+    df_gaps = engine.country_gaps(compared, year)
+    changed = df_gaps.sub(df_gaps[BASE.name], axis=0).abs().sum(axis=1) > 0
+    only_changed = st.checkbox("Only countries a scenario changes", value=True)
+    if only_changed:
+        df_gaps = df_gaps[changed]
+    st.plotly_chart(gap_figure(df_gaps), use_container_width=True)
+    st.dataframe(df_gaps.style.format("{:,.0f}"), use_container_width=True)
@@ -0,0 +1,236 @@
+# modules/scenarios.py
+#
+# Capacity what-if scenarios over the asset-level lists of both sources
+# (CRU "P4 Capacity list", S&P Global "P4__AssetList"). A scenario is an
+# ordered tuple of overlay edits (closures, timing shifts, scaling factors)
+# on the assets matching a few key columns. The base SheetViews are never
+# copied or modified: a scenario evaluates to a sparse delta (edited minus
+# base, affected rows only) and every aggregate is the cached base aggregate
+# plus the grouped delta, so only the countries an edit touches change.
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from modules.reconciliation import align_sources, capacity_matrix
+from modules.sheet_registry import CRU, SPG
+
+COUNTRY_COLUMN = {CRU: "Country", SPG: "Geography"}
+
+
+def _match_rows(view, match):
+    """Asset rows whose key columns equal every (column, value) pair of `match` (case-insensitive).
+
+    Rows with a blank country (the CRU list's World total row) are never
+    matched, so an empty match selects every asset exactly once.
+    """
+    rows = view.keys[COUNTRY_COLUMN[view.source]] != None  # noqa: E711 - elementwise on object array
+    for col, value in match:
+        if col not in view.keys:
+            raise KeyError(f"{view.source} sheet '{view.sheet}' has no key column '{col}'")
+        rows &= view.mask(col, value, case_sensitive=False)
+    return rows
+
+def _describe_match(match):
+    return ", ".join(f"{col} = {value}" for col, value in match) or "all assets"
+
+
+@dataclass(frozen=True)
+class Closure:
+    """Matching assets have no capacity from `year` on."""
+    source: str
+    match: tuple
+    year: int
+
+    def apply(self, block, years):
+        block[:, years >= self.year] = 0.0
+
+    def describe(self):
+        return f"{self.source}: close {_describe_match(self.match)} from {self.year}"
+
+
+@dataclass(frozen=True)
+class Shift:
+    """Matching assets' capacity profile moves `years` later (earlier if negative)."""
+    source: str
+    match: tuple
+    years: int
+
+    def apply(self, block, years):
+        # Years shifted in from outside the span repeat the first / last value
+        src = np.clip(np.arange(block.shape[1]) - self.years, 0, block.shape[1] - 1)
+        block[:] = block[:, src]
+
+    def describe(self):
+        verb = "delay" if self.years >= 0 else "bring forward"
+        return f"{self.source}: {verb} {_describe_match(self.match)} by {abs(self.years)} years"
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Matching assets' capacity multiplied by `factor` over [first, last]."""
+    source: str
+    match: tuple
+    factor: float
+    first: int = None
+    last: int = None
+
+    def apply(self, block, years):
+        cols = np.ones(len(years), dtype=bool)
+        if self.first is not None:
+            cols &= years >= self.first
+        if self.last is not None:
+            cols &= years <= self.last
+        block[:, cols] *= self.factor
+
+    def describe(self):
+        span = ""
+        if self.first is not None and self.last is not None:
+            span = f" in {self.first}-{self.last}"
+        elif self.first is not None:
+            span = f" from {self.first}"
+        elif self.last is not None:
+            span = f" until {self.last}"
+        return f"{self.source}: scale {_describe_match(self.match)} by x{self.factor:g}{span}"
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    edits: tuple = ()
+
+    def with_edit(self, edit):
+        return Scenario(self.name, self.edits + (edit,))
+
+BASE = Scenario("Base case")
+
+def validate_name(name):
+    """Stripped scenario name; ValueError if it is blank or the base case's name.
+
+    Tables and selectors key scenarios by name, next to the implicit base case.
+    """
+    name = name.strip()
+    if not name or name.lower() == BASE.name.lower():
+        raise ValueError(f"Pick a scenario name other than '{BASE.name}' (and not blank).")
+    return name
+
+
+class CapacityDelta:
+    """Sparse overlay of one asset list: affected row indices and their edited - base values."""
+
+    def __init__(self, view, rows, values):
+        self.view = view
+        self.rows = rows
+        self.values = values
+
+    def group_sum(self, col, standardize=None):
+        """Key x year sums of the delta (only keys of affected rows appear)."""
+        keys = self.view.key(col, standardize)[self.rows]
+        keep = keys != None  # noqa: E711 - elementwise on object array
+        groups, inverse = np.unique(keys[keep].astype(str), return_inverse=True)
+        sums = np.zeros((len(groups), self.values.shape[1]))
+        np.add.at(sums, inverse, self.values[keep])
+        return pd.DataFrame(sums, index=pd.Index(groups, name="Country"), columns=self.view.years.astype(int))
+
+    def total(self):
+        return pd.Series(self.values.sum(axis=0), index=self.view.years.astype(int))
+
+
+def evaluate(view, edits):
+    """CapacityDelta of `edits` applied in order to the matching rows of `view`.
+
+    Only the union of matched rows is gathered (as float64, blanks as 0);
+    each edit then works on its own rows of that small block.
+    """
+    masks = [_match_rows(view, edit.match) for edit in edits]
+    rows = np.flatnonzero(np.logical_or.reduce(masks)) if masks else np.array([], dtype=np.intp)
+    base = np.nan_to_num(view.values[rows].astype(np.float64))
+    edited = base.copy()
+    for edit, mask in zip(edits, masks):
+        pos = np.flatnonzero(mask[rows])
+        block = edited[pos]
+        edit.apply(block, view.years)
+        edited[pos] = block
+    return CapacityDelta(view, rows, edited - base)
+
+
+class ScenarioEngine:
+    """Evaluates scenarios against shared, read-only base views and aggregates.
+
+    `assets` maps source -> asset-list SheetView and `totals` maps source ->
+    the published total per year (CRU "World" row, S&P Global "Global" row of
+    P4_Cap_O) that a scenario's net asset change is added to. Deltas are
+    memoized per source and edit tuple, so revisiting a scenario, or two
+    scenarios sharing the same edits on one source, costs a lookup.
+    """
+
+    def __init__(self, assets, totals, standardize=None, years=range(2010, 2030)):
+        self.assets = assets
+        self.totals = totals
+        self.standardize = standardize
+        self.years = list(years)
+        self._base = {source: capacity_matrix(view, COUNTRY_COLUMN[source], self.years, standardize)
+                      for source, view in assets.items()}
+        self._deltas = {}
+
+    def delta(self, scenario, source):
+        edits = tuple(edit for edit in scenario.edits if edit.source == source)
+        key = (source, edits)
+        if key not in self._deltas:
+            self._deltas[key] = evaluate(self.assets[source], edits)
+        return self._deltas[key]
+
+    def matching_assets(self, source, match):
+        return int(_match_rows(self.assets[source], match).sum())
+
+    def country_capacity(self, source, scenario=BASE):
+        """Country x year capacity under `scenario` (the shared base table when nothing changes; do not modify)."""
+        base = self._base[source]
+        delta = self.delta(scenario, source)
+        if not len(delta.rows):
+            return base
+        change = delta.group_sum(COUNTRY_COLUMN[source], self.standardize).reindex(columns=self.years)
+        table = base.copy()
+        rows = table.loc[change.index]
+        # Years without base data stay missing unless an edit moves capacity into them
+        table.loc[change.index] = rows.where(rows.notna() | (change == 0), 0.0) + change
+        return table
+
+    def country_table(self, source, year, scenario=BASE):
+        """Country / Capacity table for one year, like SheetView.year_table."""
+        values = self.country_capacity(source, scenario)[year].dropna()
+        return pd.DataFrame({"Country": values.index, "Capacity": values.to_numpy()})
+
+    def net_change(self, source, scenario=BASE):
+        """Scenario minus base capacity per year, summed over all assets."""
+        return self.delta(scenario, source).total()
+
+    def total(self, source, scenario=BASE):
+        base = self.totals[source]
+        return base + self.net_change(source, scenario).reindex(base.index, fill_value=0.0)
+
+    def gaps(self, scenario=BASE):
+        """Aligned CRU and S&P Global country tables and their S&P Global - CRU gap."""
+        cru, spg = align_sources(self.country_capacity(CRU, scenario), self.country_capacity(SPG, scenario))
+        return cru, spg, spg.fillna(0) - cru.fillna(0)
+
+    def compare(self, scenarios, year):
+        """One row per scenario with both sources' capacity, totals and gap in `year`."""
+        rows = []
+        for scenario in scenarios:
+            cru, spg, gap = self.gaps(scenario)
+            rows.append({
+                "Scenario": scenario.name,
+                "Edits": len(scenario.edits),
+                "CRU Capacity": cru[year].sum(),
+                "S&P Global Capacity": spg[year].sum(),
+                "Gap (S&P - CRU)": gap[year].sum(),
+                "CRU World Total": self.total(CRU, scenario).get(year, np.nan),
+                "S&P Global KPI": self.total(SPG, scenario).get(year, np.nan)
+            })
+        return pd.DataFrame(rows).set_index("Scenario")
+
+    def country_gaps(self, scenarios, year):
+        """Country x scenario table of the S&P Global - CRU gap in `year`."""
+        return pd.DataFrame({scenario.name: self.gaps(scenario)[2][year] for scenario in scenarios}).fillna(0)
@@ -0,0 +1,209 @@
+# modules/sheet_registry.py
+#
+# Single source of truth for the layout of every sheet we read: header row,
+# key columns, year span, units and dtypes. Each schema is compiled once into
+# a ParsePlan; the plan validates the parsed header at ingest and normalizes
+# the frame (string column labels, named key columns, numeric year columns)
+# so downstream code never has to sniff columns again. It then compacts it:
+# float32 values, categorical key columns, all-blank columns dropped.
+
+from dataclasses import dataclass
+
+import pandas as pd
+
+CRU = "CRU"
+SPG = "S&P Global"
+
+class SheetLayoutError(ValueError):
+    """Raised when a sheet does not match its registered layout."""
+
+
+@dataclass(frozen=True)
+class SheetSchema:
+    header_row: int
+    key_columns: tuple
+    year_span: tuple = None
+    units: str = ""
+    # Key columns whose header cell is blank (or holds a title) are taken by position
+    key_positions: tuple = None
+    required_columns: tuple = ()
+    value_dtype: str = "float32"
+    # Defaults to the key columns
+    categorical_columns: tuple = None
+    # Drop all-blank (spacer) columns; unlabelled columns holding data are kept
+    drop_blank: bool = True
+
+
+@dataclass(frozen=True)
+class ParsePlan:
+    source: str
+    sheet: str
+    header_row: int
+    key_columns: tuple
+    year_columns: tuple
+    units: str
+    key_positions: tuple
+    required_columns: tuple
+    value_dtype: str
+    categorical_columns: tuple
+    drop_blank: bool
+
+    def validate(self, df):
+        """Fail fast with a message naming the sheet, header row and missing columns."""
+        labels = [str(c) for c in df.columns]
+        problems = []
+        if self.key_positions is not None and len(labels) <= max(self.key_positions):
+            problems.append(f"expected at least {max(self.key_positions) + 1} columns, found {len(labels)}")
+        keys = [] if self.key_positions is not None else list(self.key_columns)
+        missing = [c for c in keys + list(self.required_columns) if c not in labels]
+        if missing:
+            problems.append(f"missing columns {missing}")
+        missing_years = [c for c in self.year_columns if c not in labels]
+        if missing_years:
+            problems.append(f"missing {len(missing_years)} year columns ({missing_years[0]}..{missing_years[-1]})")
+        if problems:
+            raise SheetLayoutError(
+                f"{self.source} sheet '{self.sheet}' (header row {self.header_row + 1}): "
+                + "; ".join(problems) + f". Found columns: {labels[:12]}{' ...' if len(labels) > 12 else ''}"
+            )
+
+    def apply(self, df):
+        """Validate, normalize and compact a frame parsed with `header=self.header_row`."""
+        self.validate(df)
+        bytes_before = int(df.memory_usage(deep=True).sum())
+        labels = [str(c) for c in df.columns]
+        if self.key_positions is not None:
+            for pos, name in zip(self.key_positions, self.key_columns):
+                labels[pos] = name
+        df.columns = labels
+        for col in self.year_columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(self.value_dtype)
+        df = self.compact(df)
+        df.attrs["memory"] = {"before": bytes_before, "after": int(df.memory_usage(deep=True).sum())}
+        return df
+
+    def compact(self, df):
+        keep = set(self.key_columns) | set(self.year_columns) | set(self.required_columns)
+        if self.drop_blank:
+            drop = [c for c in df.columns if c not in keep and df[c].isna().all()]
+            df = df.drop(columns=drop)
+        for col in self.categorical_columns:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        # Remaining numeric columns (trade partners, furnace counts) share the value dtype
+        for col in df.select_dtypes(include="number").columns:
+            if col not in self.year_columns:
+                df[col] = df[col].astype(self.value_dtype)
+        return df
+
+
+# Shared layouts: CRU S&D and trade sheets leave the key header cells blank
+_CRU_SD = dict(header_row=2, key_columns=("Region", "Sub-region", "Country"), key_positions=(0, 1, 2),
+               year_span=(2010, 2029), units="'000 t product")
+_SPG_SD = dict(header_row=8, key_columns=("Region", "Sub-region", "Geography"), year_span=(1980, 2050))
+_CRU_TRADE = dict(header_row=2, key_columns=("Region", "Sub-region", "Country"), key_positions=(0, 1, 2),
+                  units="'000 t product", required_columns=("WorldTotal",))
+
+SHEET_SCHEMAS = {
+    # CRU specialty phosphates market outlook workbook
+    (CRU, "P4 Capacity list"): SheetSchema(
+        header_row=3, key_columns=("Region", "Country", "Company", "Site", "Product", "Status"),
+        year_span=(2010, 2029), units="'000 t product"
+    ),
+    (CRU, "P4 Capacity"): SheetSchema(**_CRU_SD),
+    (CRU, "P4 Production"): SheetSchema(**_CRU_SD),
+    (CRU, "P4 Demand"): SheetSchema(**_CRU_SD),
+    (CRU, "P4 Imports"): SheetSchema(**_CRU_SD),
+    (CRU, "P4 Exports"): SheetSchema(**_CRU_SD),
+    (CRU, "P4 2021 Trade"): SheetSchema(**_CRU_TRADE),
+    (CRU, "P4 2022 Trade"): SheetSchema(**_CRU_TRADE),
+    (CRU, "P4 2023 Trade"): SheetSchema(**_CRU_TRADE),
+
+    # S&P Global PIEC raw materials datafile
+    (SPG, "P4__AssetList"): SheetSchema(
+        header_row=6, key_columns=("Geography", "Company", "Location", "Status", "Scenario"),
+        year_span=(2010, 2050), units="kt product/year"
+    ),
+    (SPG, "P4_Cap_O"): SheetSchema(units="kt product/year", **_SPG_SD),
+    (SPG, "P4_Cap_H"): SheetSchema(units="kt product/year", **_SPG_SD),
+    (SPG, "P4_UR"): SheetSchema(units="% of capacity", **_SPG_SD),
+    (SPG, "P4_P"): SheetSchema(units="kt product", **_SPG_SD),
+    (SPG, "P4_I"): SheetSchema(units="kt product", **_SPG_SD),
+    (SPG, "P4_E"): SheetSchema(units="kt product", **_SPG_SD),
+    (SPG, "P4_D"): SheetSchema(units="kt product", **_SPG_SD),
+}
+
+
+def compile_plan(source, sheet, schema):
+    years = ()
+    if schema.year_span:
+        first, last = schema.year_span
+        years = tuple(str(y) for y in range(first, last + 1))
+    if schema.key_positions is not None and len(schema.key_positions) != len(schema.key_columns):
+        raise SheetLayoutError(f"{source} sheet '{sheet}': key_positions and key_columns differ in length")
+    return ParsePlan(
+        source=source,
+        sheet=sheet,
+        header_row=schema.header_row,
+        key_columns=schema.key_columns,
+        year_columns=years,
+        units=schema.units,
+        key_positions=schema.key_positions,
+        required_columns=schema.required_columns,
+        value_dtype=schema.value_dtype,
+        categorical_columns=schema.key_columns if schema.categorical_columns is None else schema.categorical_columns,
+        drop_blank=schema.drop_blank
+    )
+
+# Compiled once at import
+PARSE_PLANS = {key: compile_plan(*key, schema) for key, schema in SHEET_SCHEMAS.items()}
+
+
+def sheets_for(source):
+    """Registered sheet names of one source, in registry order."""
+    return [sheet for (src, sheet) in PARSE_PLANS if src == source]
+
+def plan_for(source, sheet):
+    return PARSE_PLANS[(source, sheet)]
+
+def year_columns(source, sheet, first=None, last=None):
+    """Registered year column labels of a sheet, optionally clipped to [first, last]."""
+    return [c for c in plan_for(source, sheet).year_columns
+            if (first is None or int(c) >= first) and (last is None or int(c) <= last)]
+
+def load_sheets(file_path, source):
+    """Parse every registered sheet of `source` from one workbook.
+
+    Returns {sheet: DataFrame}; a missing sheet or a layout mismatch is
+    reported as a message string in that sheet's slot.
+    """
+    xl = pd.ExcelFile(file_path)
+    data = {}
+    for sheet in sheets_for(source):
+        if sheet not in xl.sheet_names:
+            data[sheet] = f"Sheet '{sheet}' not found"
+            continue
+        plan = plan_for(source, sheet)
+        try:
+            data[sheet] = plan.apply(xl.parse(sheet, header=plan.header_row))
+        except SheetLayoutError as e:
+            data[sheet] = str(e)
+    return data
+
+def load_error(sheets, sheet):
+    """Why `sheet` is missing from a loader's output: its slot's message
+    (layout mismatch, sheet not found) or the workbook-level error."""
+    if isinstance(sheets.get(sheet), str):
+        return sheets[sheet]
+    if isinstance(sheets.get("error"), str):
+        return sheets["error"]
+    return f"Failed to load '{sheet}'."
+
+def memory_report(sheets):
+    """Per-sheet memory before and after compaction, from the loaders' output."""
+    rows = []
+    for sheet, df in sheets.items():
+        if isinstance(df, pd.DataFrame) and "memory" in df.attrs:
+            before, after = df.attrs["memory"]["before"], df.attrs["memory"]["after"]
+            rows.append({"Sheet": sheet, "Rows": len(df), "Bytes Before": before, "Bytes After": after, "Saved": before - after})
+    return pd.DataFrame(rows, columns=["Sheet", "Rows", "Bytes Before", "Bytes After", "Saved"])
@@ -0,0 +1,41 @@
+# modules/sql_query_module.py
+
+import streamlit as st
+from modules import lineage
+from modules.query_engine import list_tables, query
+
+DEFAULT_QUERY = """SELECT Country, Year, CRU, "S&P Global", Delta
+FROM gaps
+WHERE Year BETWEEN 2020 AND 2029
+ORDER BY ABS(Delta) DESC
+LIMIT 20"""
+
+def show():
+    st.header("🧮 SQL Query (read-only)")
+
+    with st.expander("📚 Tables & columns"):
+        st.dataframe(list_tables(), use_container_width=True, hide_index=True)
+
+    with st.expander("🧬 Data Lineage"):
+        params = lineage.default_params()
+        st.caption("Each cached artifact is versioned by the fingerprints of its workbooks, constants, code and upstream artifacts.")
+        st.dataframe(lineage.explain(**params), use_container_width=True, hide_index=True)
+        node = st.selectbox("Artifact", list(lineage.GRAPH))
+        st.dataframe(lineage.inputs_table(node, **params), use_container_width=True, hide_index=True)
+        if lineage.GRAPH[node].columns:
+            st.dataframe(lineage.columns_table(node), use_container_width=True, hide_index=True)
+        st.caption(f"Invalidates: {', '.join(lineage.downstream(node)) or 'nothing downstream'}")
+        st.graphviz_chart(lineage.to_dot())
+
+    sql = st.text_area("SQL", value=DEFAULT_QUERY, height=160)
+    if not sql.strip():
+        return
+
+    try:
+        result = query(sql)
+    except Exception as e:
+        st.error(str(e))
+        return
+
+    st.caption(f"{len(result):,} rows")
+    st.dataframe(result, use_container_width=True, hide_index=True)
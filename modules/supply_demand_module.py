@@ -1,15 +1,18 @@
 ###working like a charm V1
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
-from modules.rawdata import load_raw_p4_sheets
+from modules.dataset_view import build_views
+from modules.progressive import stream_charts, submit
+from modules.rawdata import default_file, load_raw_p4_sheets
+from modules.sheet_registry import CRU, load_error
 import os
 import random
 
-DEFAULT_FILE = "data/specialty-phosphates-market-outlook-database-february-2025-amended.xlsx"
 METRICS = {
     "P4 Capacity": "Capacity",
     "P4 Production": "Production",
@@ -18,60 +21,27 @@ METRICS = {
     "P4 Imports": "Imports"
 }
 
-@st.cache_data
-def extract_level1_regions(df):
-    return sorted(set(df.iloc[:, 0].astype(str).str.strip().dropna().unique()))
+def extract_level1_regions(view):
+    return view.unique("Region")
 
-@st.cache_data
-def extract_metric_row(df, region):
-    df = df.copy()
-    df = df.loc[:, ~df.columns.duplicated()]  # remove duplicate headers
-
-    year_cols = [col for col in df.columns if str(col).isdigit()]
-    df_years = df[["Unnamed: 0"] + year_cols] if "Unnamed: 0" in df.columns else df[[df.columns[0]] + year_cols]
-    df_years.columns = ["Region"] + year_cols
-
-    match = df_years[df_years["Region"].astype(str).str.strip() == region]
-    if not match.empty:
-        row = match.iloc[0][year_cols]
-        row = row[~row.index.duplicated(keep="first")]
-        row.index = pd.Series(row.index).astype(int)
-        return pd.to_numeric(row, errors="coerce")
-    return pd.Series([None] * len(year_cols), index=pd.Series(year_cols).astype(int))
-
-def show():
-    st.header("📊 P4 Supply & Demand Table")
-
-    file_path = st.text_input("Excel file name", value=DEFAULT_FILE)
-    raw_data = load_raw_p4_sheets(file_path)
-
-    # Reference for dropdown values
-    base_sheet = raw_data.get("P4 Capacity")
-    if not isinstance(base_sheet, pd.DataFrame):
-        st.error("Failed to load 'P4 Capacity'.")
-        return
-
-    region_options = extract_level1_regions(base_sheet)
-    region = st.selectbox("🌍 Select major region", ["World Total"] + region_options, index=0)
+def extract_metric_row(view, region):
+    return view.row("Region", region)
 
+def summary_table(views, region):
+    """Metric x year table of one Region row per METRICS sheet."""
     summary_data = {}
     for sheet, metric in METRICS.items():
-        df = raw_data.get(sheet)
-        if isinstance(df, pd.DataFrame):
-            row = extract_metric_row(df, region)
+        view = views.get(sheet)
+        if view is not None:
+            row = extract_metric_row(view, region)
             summary_data[metric] = row
 
     summary_df = pd.DataFrame.from_dict(summary_data, orient="index")
     summary_df.index.name = "Metric"
     summary_df.columns.name = "Year"
-    summary_df = summary_df.sort_index(axis=1)
-
-    st.dataframe(
-        summary_df.style.format(lambda x: f"{x:,.0f}" if pd.notnull(x) else ""),
-        use_container_width=True
-    )
+    return summary_df.sort_index(axis=1)
 
-    # ------------- 📈 Charts --------------
+def supply_figure(summary_df):
     years = summary_df.columns.astype(int)
 
     # Supply Chart: Overlapping Bars (not stacked)
@@ -97,6 +67,10 @@ def show():
         margin=dict(t=20, b=40, l=20, r=20),
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
+    return fig_supply
+
+def demand_figure(summary_df):
+    years = summary_df.columns.astype(int)
 
     # Demand Chart (still fine as stacked)
     fig_demand = go.Figure()
@@ -117,54 +91,9 @@ def show():
         margin=dict(t=20, b=40, l=20, r=20),
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
+    return fig_demand
 
-    # Display side by side with titles outside
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.markdown(f"##### 📈 {region} Supply, '000 t/y P4")
-        st.plotly_chart(fig_supply, use_container_width=True)
-
-    with col2:
-        st.markdown(f"##### 📈 {region} Demand, '000 t/y P4")
-        st.plotly_chart(fig_demand, use_container_width=True)
-    
-    
-    
-    import plotly.express as px
-    from geopy.geocoders import Nominatim
-    from geopy.extra.rate_limiter import RateLimiter
-    
-   
-
-    # ------------------------------
-    # 📊 Pareto Chart by Country + Company
-    # ------------------------------
-    st.subheader("📊 Pareto Chart: Capacity by Country")
-    
-    df_caplist = raw_data.get("P4 Capacity list")
-    if not isinstance(df_caplist, pd.DataFrame):
-        st.warning("⚠️ 'P4 Capacity list' not available.")
-        return
-    
-    # Clean headers and select year
-    df_caplist.columns = df_caplist.columns.map(str)
-    year_col = str(st.slider("📅 Select Year for Pareto", 2010, 2029, 2021))
-    
-    if year_col not in df_caplist.columns:
-        st.warning(f"Year {year_col} not found in dataset.")
-        return
-    
-    # Process country-level data
-    df_pareto = df_caplist[["Country", "Company", year_col]].copy()
-    df_pareto = df_pareto.rename(columns={year_col: "Capacity"})
-    df_pareto["Capacity"] = pd.to_numeric(df_pareto["Capacity"], errors="coerce")
-    df_pareto = df_pareto.dropna(subset=["Country", "Capacity"])
-    df_country = df_pareto.groupby("Country", as_index=False)["Capacity"].sum()
-    df_country = df_country.sort_values("Capacity", ascending=False)
-    df_country["Cumulative"] = df_country["Capacity"].cumsum()
-    df_country["Cumulative %"] = df_country["Cumulative"] / df_country["Capacity"].sum() * 100
-    
+def country_pareto_figure(df_country):
     # Country Pareto Chart with values
     fig_country = go.Figure()
     fig_country.add_trace(go.Bar(
@@ -192,30 +121,9 @@ def show():
         margin=dict(t=40, b=40, l=20, r=20),
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
-    st.plotly_chart(fig_country, use_container_width=True)
-    
-    # Company-level Drilldown
-    #selected_country = st.selectbox("🔍 Select Country to Explore Companies", df_country["Country"])
-    #top_n = st.selectbox("🏭 Companies to Show", options=["All", 3, 5, 7, 10,20,30], index=0, key="n_companies_dropdown")
-    
-    col_country, col_limit = st.columns([3, 2])
-    with col_country:
-        selected_country = st.selectbox("🔍 Select Country to Explore Companies", df_country["Country"])
-    with col_limit:
-        top_n = st.selectbox("🏭 Companies to Show", options=["All", 3, 7, 10, 20, 30, 35, 40], index=7, key="n_companies_dropdown")
-    
-    df_company = df_pareto[df_pareto["Country"] == selected_country]
-    df_company = df_company.groupby("Company", as_index=False)["Capacity"].sum()
-    df_company = df_company.sort_values("Capacity", ascending=False)
-    
-    if top_n != "All":
-        df_company = df_company.head(int(top_n))
-    
-    df_company["Cumulative"] = df_company["Capacity"].cumsum()
-    df_company["Cumulative %"] = df_company["Cumulative"] / df_company["Capacity"].sum() * 100
-    
+    return fig_country
 
-    
+def company_pareto_figure(df_company):
     fig_company = go.Figure()
     fig_company.add_trace(go.Bar(
         x=df_company["Company"],
@@ -242,77 +150,183 @@ def show():
         margin=dict(t=40, b=40, l=20, r=20),
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
-    st.subheader(f"🏭 Capacity Breakdown in {selected_country}")
+    return fig_company
+
+def evolution_figure(cap_view):
+    """Capacity per country over time, with the World Total line highlighted."""
+    # ---- All countries: grouped sum per Country & Year ----
+    df_wide = cap_view.group_sum("Country", min_count=1)
+
+    # ---- World Total: the rows with a blank Country ----
+    world_rows = cap_view.keys["Country"] == None  # noqa: E711
+    if world_rows.any():
+        block = cap_view.values[world_rows]
+        df_wide.loc["World Total"] = np.where(np.isnan(block).all(axis=0), np.nan, np.nansum(block, axis=0))
+
+    df_grouped = df_wide.melt(ignore_index=False, var_name="Year", value_name="Capacity").reset_index()
+    df_grouped = df_grouped.dropna(subset=["Capacity"])
+
+    # Setup color and line settings
+    df_grouped["color"] = df_grouped["Country"].apply(
+        lambda x: "crimson" if x.strip().lower() == "world total" else "lightgray"
+    )
+    df_grouped["line_name"] = df_grouped["Country"].apply(
+        lambda x: "🌍 World Total" if x.strip().lower() == "world total" else x
+    )
+
+    # Plotting
+    fig_lines = go.Figure()
+    for country in df_grouped["Country"].unique():
+        df_c = df_grouped[df_grouped["Country"] == country]
+        fig_lines.add_trace(go.Scatter(
+            x=df_c["Year"],
+            y=df_c["Capacity"],
+            mode="lines+markers",
+            name=df_c["line_name"].iloc[0],
+            line=dict(
+                width=3 if country.lower().strip() == "world total" else 1.5,
+                color="crimson" if country.lower().strip() == "world total" else None
+            ),
+            opacity=1.0 if country.lower().strip() == "world total" else 0.5
+        ))
+
+    fig_lines.update_layout(
+        height=500,
+        xaxis_title="Year",
+        yaxis_title="Capacity (kt/y)",
+        plot_bgcolor="#0e1117",
+        paper_bgcolor="#0e1117",
+        font_color="white",
+        legend_title="Country",
+        margin=dict(t=30, b=40, l=20, r=20)
+    )
+    return fig_lines
+
+def show():
+    st.header("📊 P4 Supply & Demand Table")
+
+    file_path = st.text_input("Excel file name", value=default_file())
+    # Every widget below needs the workbook, so load it on the script thread
+    with st.spinner("Loading CRU workbook..."):
+        raw_data = load_raw_p4_sheets(file_path)
+    views = build_views(raw_data, CRU)
+
+    # The evolution chart depends on no widget: start building it right away
+    cap_view = views.get("P4 Capacity list")
+    chart_jobs = []
+    evolution_job = submit(evolution_figure, cap_view) if cap_view is not None else None
+
+    # Reference for dropdown values
+    base_sheet = views.get("P4 Capacity")
+    if base_sheet is None:
+        st.error(load_error(raw_data, "P4 Capacity"))
+        return
+
+    region_options = extract_level1_regions(base_sheet)
+    region = st.selectbox("🌍 Select major region", ["World Total"] + region_options, index=0)
+
+    summary_df = summary_table(views, region)
+
+    st.dataframe(
+        summary_df.style.format(lambda x: f"{x:,.0f}" if pd.notnull(x) else ""),
+        use_container_width=True
+    )
+
+    # ------------- 📈 Charts --------------
+    # Display side by side with titles outside
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown(f"##### 📈 {region} Supply, '000 t/y P4")
+        chart_jobs.append((st.empty(), submit(supply_figure, summary_df)))
+
+    with col2:
+        st.markdown(f"##### 📈 {region} Demand, '000 t/y P4")
+        chart_jobs.append((st.empty(), submit(demand_figure, summary_df)))
+
+    # --- Every region in one static HTML file ---
+    from modules.report_pack import show_report_panel
+    with st.expander("🗂️ Report Pack (all regions, HTML)"):
+        show_report_panel()
+    
+    
+    
+    import plotly.express as px
+    from geopy.geocoders import Nominatim
+    from geopy.extra.rate_limiter import RateLimiter
+    
+   
 
-    st.plotly_chart(fig_company, use_container_width=True)
-   # ------------------------------
-    # 📈 Capacity Evolution Over Time by Country (with World Total)
     # ------------------------------
-    st.subheader("📈 Capacity Evolution Over Time by Country")
+    # 📊 Pareto Chart by Country + Company
+    # ------------------------------
+    st.subheader("📊 Pareto Chart: Capacity by Country")
     
-    df_caplist = raw_data.get("P4 Capacity list")
-    if isinstance(df_caplist, pd.DataFrame):
-        df_caplist.columns = df_caplist.columns.map(str)
+    if cap_view is None:
+        stream_charts(chart_jobs)
+        st.warning(f"⚠️ {load_error(raw_data, 'P4 Capacity list')}")
+        return
     
-        year_cols = [col for col in df_caplist.columns if col.isdigit()]
-        meta_cols = ["Country"]
+    # Select year
+    pareto_year = st.slider("📅 Select Year for Pareto", 2010, 2029, 2021)
     
-        # ---- Extract World Total ----
-        world_row = df_caplist[df_caplist["Country"].isna() | (df_caplist["Country"].astype(str).str.strip() == "")]
-        df_world = world_row[year_cols].copy()
-        df_world["Country"] = "World Total"
-        df_world = df_world.melt(id_vars="Country", var_name="Year", value_name="Capacity")
+    if pareto_year not in cap_view.years:
+        stream_charts(chart_jobs)
+        st.warning(f"Year {pareto_year} not found in dataset.")
+        return
     
-        # ---- Extract All Other Countries ----
-        df_long = df_caplist[meta_cols + year_cols].dropna(subset=["Country"]).copy()
-        df_long = df_long.melt(id_vars="Country", var_name="Year", value_name="Capacity")
+    # Process country-level data
+    capacity = cap_view.year(pareto_year)
+    countries = cap_view.keys["Country"]
+    keep = (countries != None) & ~np.isnan(capacity)  # noqa: E711
+    df_pareto = pd.DataFrame({
+        "Country": countries[keep],
+        "Company": cap_view.keys["Company"][keep],
+        "Capacity": capacity[keep]
+    })
+    df_country = df_pareto.groupby("Country", as_index=False, observed=True)["Capacity"].sum()
+    df_country = df_country.sort_values("Capacity", ascending=False)
+    df_country["Cumulative"] = df_country["Capacity"].cumsum()
+    df_country["Cumulative %"] = df_country["Cumulative"] / df_country["Capacity"].sum() * 100
     
-        # Combine World and others
-        combined = pd.concat([df_long, df_world], ignore_index=True)
-        combined["Capacity"] = pd.to_numeric(combined["Capacity"], errors="coerce")
-        combined = combined.dropna(subset=["Capacity"])
-        combined["Year"] = combined["Year"].astype(int)
+    chart_jobs.append((st.empty(), submit(country_pareto_figure, df_country)))
     
-        # Grouped sum (per Country & Year)
-        df_grouped = combined.groupby(["Country", "Year"], as_index=False)["Capacity"].sum()
+    # Company-level Drilldown
+    #selected_country = st.selectbox("🔍 Select Country to Explore Companies", df_country["Country"])
+    #top_n = st.selectbox("🏭 Companies to Show", options=["All", 3, 5, 7, 10,20,30], index=0, key="n_companies_dropdown")
     
-        # Setup color and line settings
-        df_grouped["color"] = df_grouped["Country"].apply(
-            lambda x: "crimson" if x.strip().lower() == "world total" else "lightgray"
-        )
-        df_grouped["line_name"] = df_grouped["Country"].apply(
-            lambda x: "🌍 World Total" if x.strip().lower() == "world total" else x
-        )
+    col_country, col_limit = st.columns([3, 2])
+    with col_country:
+        selected_country = st.selectbox("🔍 Select Country to Explore Companies", df_country["Country"])
+    with col_limit:
+        top_n = st.selectbox("🏭 Companies to Show", options=["All", 3, 7, 10, 20, 30, 35, 40], index=7, key="n_companies_dropdown")
+    
+    df_company = df_pareto[df_pareto["Country"] == selected_country]
+    df_company = df_company.groupby("Company", as_index=False, observed=True)["Capacity"].sum()
+    df_company = df_company.sort_values("Capacity", ascending=False)
     
-        # Plotting
-        fig_lines = go.Figure()
-        for country in df_grouped["Country"].unique():
-            df_c = df_grouped[df_grouped["Country"] == country]
-            fig_lines.add_trace(go.Scatter(
-                x=df_c["Year"],
-                y=df_c["Capacity"],
-                mode="lines+markers",
-                name=df_c["line_name"].iloc[0],
-                line=dict(
-                    width=3 if country.lower().strip() == "world total" else 1.5,
-                    color="crimson" if country.lower().strip() == "world total" else None
-                ),
-                opacity=1.0 if country.lower().strip() == "world total" else 0.5
-            ))
+    if top_n != "All":
+        df_company = df_company.head(int(top_n))
     
-        fig_lines.update_layout(
-            height=500,
-            xaxis_title="Year",
-            yaxis_title="Capacity (kt/y)",
-            plot_bgcolor="#0e1117",
-            paper_bgcolor="#0e1117",
-            font_color="white",
-            legend_title="Country",
-            margin=dict(t=30, b=40, l=20, r=20)
-        )
+    df_company["Cumulative"] = df_company["Capacity"].cumsum()
+    df_company["Cumulative %"] = df_company["Cumulative"] / df_company["Capacity"].sum() * 100
     
-        st.plotly_chart(fig_lines, use_container_width=True)
+
+    
+    st.subheader(f"🏭 Capacity Breakdown in {selected_country}")
+
+    chart_jobs.append((st.empty(), submit(company_pareto_figure, df_company)))
+   # ------------------------------
+    # 📈 Capacity Evolution Over Time by Country (with World Total)
+    # ------------------------------
+    st.subheader("📈 Capacity Evolution Over Time by Country")
+    
+    if evolution_job is not None:
+        chart_jobs.append((st.empty(), evolution_job))
     else:
-        st.warning("Could not load 'P4 Capacity list' for country evolution.")
+        st.warning(load_error(raw_data, "P4 Capacity list"))
+
+    # Charts fill their slots in whatever order they finish
+    stream_charts(chart_jobs)
 
         
\ No newline at end of file
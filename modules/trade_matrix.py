@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from modules.sheet_registry import CRU, plan_for
+
+# Trade sheets: importers down the rows, exporters across the columns (000 t product)
+TRADE_SHEETS = {
+    2021: "P4 2021 Trade",
+    2022: "P4 2022 Trade",
+    2023: "P4 2023 Trade"
+}
+
+# Importer key columns and the summary column at the right edge of every trade sheet
+KEY_COLUMNS = plan_for(CRU, TRADE_SHEETS[2021]).key_columns
+TOTAL_COLUMN = "WorldTotal"
+
+
+class TradeMatrix:
+    """Exporter x importer x year P4 flows with country index maps.
+
+    `flows[i, j, k]` is the volume shipped from `countries[i]` to
+    `countries[j]` in `years[k]`.
+    """
+
+    def __init__(self, flows, countries, years, regions):
+        self.flows = flows
+        self.countries = list(countries)
+        self.years = list(years)
+        self.regions = dict(regions)
+        self.country_index = {c: i for i, c in enumerate(self.countries)}
+        self.year_index = {y: i for i, y in enumerate(self.years)}
+
+        # Country -> region indicator matrix, used for all regional roll-ups
+        self.region_names = sorted(set(self.regions.get(c, "Unidentified") for c in self.countries))
+        region_pos = {r: i for i, r in enumerate(self.region_names)}
+        self.region_indicator = np.zeros((len(self.countries), len(self.region_names)), dtype=np.float32)
+        for i, country in enumerate(self.countries):
+            self.region_indicator[i, region_pos[self.regions.get(country, "Unidentified")]] = 1.0
+
+    def year_slice(self, year):
+        return self.flows[:, :, self.year_index[year]]
+
+    def top_partners(self, country, year, n=5, direction="exports"):
+        """Largest partners of `country`: destinations for exports, origins for imports."""
+        if country not in self.country_index:
+            return pd.DataFrame(columns=["Partner", "Volume"])
+        flows = self.year_slice(year)
+        i = self.country_index[country]
+        volumes = flows[i, :] if direction == "exports" else flows[:, i]
+
+        order = np.argsort(volumes)[::-1][:n]
+        order = order[volumes[order] > 0]
+        return pd.DataFrame({
+            "Partner": [self.countries[k] for k in order],
+            "Volume": volumes[order]
+        })
+
+    def net_flows(self, year):
+        """Exports, imports and net exports per country for one year."""
+        flows = self.year_slice(year)
+        exports = flows.sum(axis=1)
+        imports = flows.sum(axis=0)
+        df = pd.DataFrame({
+            "Country": self.countries,
+            "Exports": exports,
+            "Imports": imports,
+            "Net": exports - imports
+        })
+        return df[(df["Exports"] > 0) | (df["Imports"] > 0)].sort_values("Net", ascending=False)
+
+    def region_flows(self, year):
+        """Region x region flow table (exporting region rows, importing region columns)."""
+        r = self.region_indicator
+        aggregated = r.T @ self.year_slice(year) @ r
+        return pd.DataFrame(aggregated, index=self.region_names, columns=self.region_names)
+
+    def region_weighted_average(self, values, year, direction="imports"):
+        """Trade-weighted average of a per-country Series within each region.
+
+        Each country is weighted by its import (or export) volume in `year`;
+        countries missing from `values` carry no weight.
+        """
+        flows = self.year_slice(year)
+        weights = flows.sum(axis=0) if direction == "imports" else flows.sum(axis=1)
+        vals = values.reindex(self.countries).to_numpy(dtype=np.float64)
+        weights = np.where(np.isnan(vals), 0.0, weights)
+        vals = np.nan_to_num(vals)
+
+        r = self.region_indicator
+        weight_sums = weights @ r
+        weighted = (weights * vals) @ r
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = np.where(weight_sums > 0, weighted / weight_sums, np.nan)
+        return pd.Series(averages, index=self.region_names)
+
+
+def _parse_trade_sheet(df):
+    """Return (importer -> region, exporters, importer x exporter values) for one sheet."""
+    labels = df[["Region", "Country"]].astype(str).apply(lambda s: s.str.strip())
+    # Regional subtotal rows all end with "Total" in the Region column
+    is_country = ~labels["Region"].str.endswith("Total") & (labels["Region"] != "nan")
+
+    exporter_cols = [c for c in df.columns if c not in KEY_COLUMNS and c != TOTAL_COLUMN]
+    exporters = [c.strip() for c in exporter_cols]
+    values = df[exporter_cols].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+
+    countries = labels.loc[is_country, "Country"]
+    regions = dict(zip(countries, labels.loc[is_country, "Region"]))
+    return regions, exporters, countries.tolist(), values[is_country.to_numpy()].to_numpy(dtype=np.float32)
+
+
+def build_trade_matrix(sheets):
+    """Build a TradeMatrix from the dict returned by `load_raw_p4_sheets`."""
+    parsed = {}
+    for year, sheet in TRADE_SHEETS.items():
+        df = sheets.get(sheet)
+        if isinstance(df, pd.DataFrame):
+            parsed[year] = _parse_trade_sheet(df)
+
+    regions = {}
+    countries = []
+    for sheet_regions, exporters, importers, _ in parsed.values():
+        regions.update(sheet_regions)
+        countries.extend(importers)
+        countries.extend(exporters)
+    countries = list(dict.fromkeys(countries))
+    index = {c: i for i, c in enumerate(countries)}
+
+    years = sorted(parsed)
+    flows = np.zeros((len(countries), len(countries), len(years)), dtype=np.float32)
+    for k, year in enumerate(years):
+        _, exporters, importers, values = parsed[year]
+        exp_idx = np.array([index[c] for c in exporters], dtype=np.intp)
+        imp_idx = np.array([index[c] for c in importers], dtype=np.intp)
+        # Duplicate importer rows (if any) accumulate rather than overwrite
+        np.add.at(flows[:, :, k], (exp_idx[None, :], imp_idx[:, None]), values)
+
+    return TradeMatrix(flows, countries, years, regions)
@@ -0,0 +1,98 @@
+# tests/test_dataset_view.py
+#
+# The loaders' frames are shared by every page and session, so nothing
+# downstream of them may write into them: run every extractor over the
+# bundled workbooks and check each source frame is unchanged.
+
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import raw_materials_analysis_module as spg_page
+from modules import supply_demand_module as cru_page
+from modules.compare_sources_module import CRU_SHEET, SPG_SHEET, standardize_country_name
+from modules.dataset_view import build_views
+from modules.export_api import build_fact_table
+from modules.raw_materials_data_module import BUNDLED_FILE as SPG_FILE, load_raw_materials_data
+from modules.rawdata import BUNDLED_FILE as CRU_FILE, load_raw_p4_sheets
+from modules.reconciliation import align_sources, capacity_matrix, reconcile
+from modules.scenarios import Closure, Scale, Shift, evaluate
+from modules.sheet_registry import CRU, SPG
+
+YEARS = list(range(2010, 2030))
+
+
+@pytest.fixture(scope="module")
+def sheets():
+    return {CRU: load_raw_p4_sheets(CRU_FILE), SPG: load_raw_materials_data(SPG_FILE)}
+
+@pytest.fixture(scope="module")
+def views(sheets):
+    return {source: build_views(data, source) for source, data in sheets.items()}
+
+def frames(sheets):
+    return [(source, sheet, df) for source, data in sheets.items() for sheet, df in data.items() if isinstance(df, pd.DataFrame)]
+
+
+def test_bundled_workbooks_load(sheets):
+    assert CRU_SHEET in sheets[CRU] and isinstance(sheets[CRU][CRU_SHEET], pd.DataFrame)
+    assert SPG_SHEET in sheets[SPG] and isinstance(sheets[SPG][SPG_SHEET], pd.DataFrame)
+
+def test_extractors_do_not_mutate_loaded_frames(sheets):
+    originals = {(source, sheet): df.copy(deep=True) for source, sheet, df in frames(sheets)}
+    original_attrs = {key: copy.deepcopy(df.attrs) for key, df in originals.items()}
+
+    cru_views = build_views(sheets[CRU], CRU)
+    spg_views = build_views(sheets[SPG], SPG)
+
+    for region in ["World Total"] + cru_page.extract_level1_regions(cru_views["P4 Capacity"]):
+        cru_page.summary_table(cru_views, region)
+    for region in spg_page.region_options(spg_views):
+        spg_page.summary_table(spg_views, region)
+
+    for view in list(cru_views.values()) + list(spg_views.values()):
+        col = next(iter(view.keys))
+        view.group_sum(col, min_count=1)
+        view.group_sum(col, 2015, 2025, standardize=standardize_country_name)
+        view.year_table(col, 2025, standardize=standardize_country_name)
+
+    cru = capacity_matrix(cru_views[CRU_SHEET], "Country", YEARS, standardize_country_name)
+    spg = capacity_matrix(spg_views[SPG_SHEET], "Geography", YEARS, standardize_country_name)
+    cru, spg = align_sources(cru, spg)
+    reconcile(cru, spg, 0.3)
+    reconcile(cru, spg, 0.5, {"World": list(cru.index)}, spg.sum().to_frame("World").T)
+
+    country = cru_views[CRU_SHEET].unique("Country")[0]
+    evaluate(cru_views[CRU_SHEET], (Closure(CRU, (("Country", country),), 2020), Shift(CRU, (), 2)))
+    evaluate(spg_views[SPG_SHEET], (Scale(SPG, (), 0.5, 2015, 2025),))
+
+    build_fact_table(cru_views, spg_views)
+
+    for source, sheet, df in frames(sheets):
+        pd.testing.assert_frame_equal(df, originals[(source, sheet)], obj=f"{source} '{sheet}'")
+        assert df.attrs == original_attrs[(source, sheet)]
+
+def test_view_arrays_are_read_only(views):
+    for view in list(views[CRU].values()) + list(views[SPG].values()):
+        with pytest.raises(ValueError):
+            view.values[0, 0] = 1.0
+        with pytest.raises(ValueError):
+            view.years[0] = 1900
+        for col, keys in view.keys.items():
+            with pytest.raises(ValueError):
+                keys[0] = "changed"
+
+def test_derived_arrays_are_read_only(views):
+    view = views[CRU][CRU_SHEET]
+    with pytest.raises(ValueError):
+        view.key("Country", standardize_country_name)[0] = "changed"
+    view.mask("Country", "china", case_sensitive=False)
+    with pytest.raises(ValueError):
+        view._lowered["Country"][0] = "changed"
+    # Slices of the value block are views, so they inherit the flag
+    column = view.year(2020)
+    assert np.shares_memory(column, view.values)
+    with pytest.raises(ValueError):
+        column[0] = 1.0
@@ -0,0 +1,37 @@
+# tests/test_discrepancies.py
+
+import numpy as np
+import pandas as pd
+
+from modules.discrepancies import change_points, robust_zscores, top_discrepancies
+
+YEARS = list(range(2010, 2022))
+
+
+def test_change_point_finds_a_known_mean_shift():
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0.0, 0.5, size=(2, len(YEARS)))
+    step = np.where(np.array(YEARS) >= 2016, 40.0, 0.0)
+    delta = pd.DataFrame([10.0 + step, np.zeros(len(YEARS))] + noise, index=["China", "India"], columns=YEARS)
+
+    breaks = change_points(delta).set_index("Country")
+    assert breaks.index[0] == "China"
+    assert breaks.loc["China", "Break Year"] == 2016
+    assert abs(breaks.loc["China", "Shift"] - 40.0) < 1.0
+    assert breaks.loc["China", "Score"] > breaks.loc["India", "Score"]
+
+def test_constant_series_give_finite_scores():
+    delta = pd.DataFrame(np.full((3, len(YEARS)), 7.0), index=["China", "India", "Japan"], columns=YEARS)
+    z = robust_zscores(delta)
+    assert np.isfinite(z.to_numpy()).all()
+    assert (z.to_numpy() == 0).all()
+    breaks = change_points(delta)
+    assert np.isfinite(breaks["Score"]).all()
+
+def test_top_discrepancies_ranks_the_outlier_first():
+    cru = pd.DataFrame(np.full((3, len(YEARS)), 100.0), index=["China", "India", "Japan"], columns=YEARS)
+    spg = cru.copy()
+    spg.loc["India", 2015] = 180.0
+    table = top_discrepancies(cru, spg, top_n=3)
+    assert table.loc[0, ["Country", "Year", "Delta"]].tolist() == ["India", 2015, 80.0]
+    assert np.isfinite(table["Robust Z"]).all()
@@ -0,0 +1,64 @@
+# tests/test_export_api.py
+
+import io
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import pytest
+
+from modules import export_api
+from modules.export_api import COMPRESSIONS, ExportRequestHandler, export_bytes, filter_table, load_export_tables, write_table
+
+CASES = [(fmt, compression) for fmt, codecs in COMPRESSIONS.items() for compression in codecs]
+
+TABLE = pa.table({
+    "Source": ["CRU", "S&P Global"] * 5,
+    "Country": ["China", "China", "India", "India", "Japan", "Japan", None, "Spain", "Spain", "Spain"],
+    "Year": [2019, 2019, 2020, 2020, 2021, 2021, 2022, 2022, 2023, 2023],
+    "Value": [1.5, 2.0, None, 4.0, 5.25, 6.0, 7.0, 8.0, 9.0, 10.0]
+})
+
+
+def read_back(data, fmt):
+    if fmt == "parquet":
+        return pq.read_table(io.BytesIO(data))
+    return ipc.open_stream(data).read_all()
+
+
+@pytest.mark.parametrize("fmt,compression", CASES)
+def test_every_format_and_codec_round_trips(fmt, compression, monkeypatch):
+    # Small batches so the writers stream several row groups / record batches
+    monkeypatch.setattr(export_api, "BATCH_ROWS", 3)
+    assert read_back(export_bytes(TABLE, fmt, compression), fmt).equals(TABLE)
+
+@pytest.mark.parametrize("fmt,compression", CASES)
+def test_filtered_streaming_write_round_trips(fmt, compression):
+    table = filter_table(TABLE, sources=["CRU"], countries=["China", "Spain"], year_min=2019, year_max=2022)
+    assert table["Country"].to_pylist() == ["China"]
+    sink = io.BytesIO()
+    write_table(table, pa.PythonFile(sink, mode="w"), fmt, compression)
+    assert read_back(sink.getvalue(), fmt).equals(table)
+
+def test_unsupported_codec_is_rejected():
+    with pytest.raises(ValueError):
+        export_bytes(TABLE, "arrow", "snappy")
+    with pytest.raises(ValueError):
+        export_bytes(TABLE, "csv", "none")
+
+def test_http_endpoint_streams_the_filtered_dataset():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ExportRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        expected = filter_table(load_export_tables()["comparison"], sources=["CRU"], year_min=2020)
+        for fmt, compression in CASES:
+            url = f"http://127.0.0.1:{server.server_port}/comparison.{fmt}?source=CRU&year_min=2020&compression={compression}"
+            with urllib.request.urlopen(url) as response:
+                assert read_back(response.read(), fmt).equals(expected)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,80 @@
+# tests/test_lineage.py
+
+import importlib
+import shutil
+import sys
+import zipfile
+
+import pytest
+
+from modules import lineage
+from modules.compare_sources_module import COUNTRY_NAME_FIXES
+from modules.raw_materials_data_module import BUNDLED_FILE as SPG_FILE
+from modules.rawdata import BUNDLED_FILE as CRU_FILE
+
+FIXES = "config modules.compare_sources_module:COUNTRY_NAME_FIXES"
+
+
+@pytest.fixture
+def params(tmp_path):
+    cru_file, spg_file = str(tmp_path / "cru.xlsx"), str(tmp_path / "spg.xlsx")
+    shutil.copy(CRU_FILE, cru_file)
+    shutil.copy(SPG_FILE, spg_file)
+    return {"cru_file": cru_file, "spg_file": spg_file}
+
+def explained(node, **params):
+    return lineage.explain(**params).set_index("Node").loc[node]
+
+
+def test_changed_workbook_changes_the_versions_that_read_it(params):
+    before = {name: lineage.version(name, **params) for name in lineage.GRAPH}
+    recorded = lineage.inputs("cru_sheets", **params)
+    lineage.note_built("cru_sheets", before["cru_sheets"], **params)
+
+    with zipfile.ZipFile(params["cru_file"], "a") as archive:
+        archive.writestr("customXml/touched.xml", "<touched/>")
+    after = {name: lineage.version(name, **params) for name in lineage.GRAPH}
+
+    changed = {name for name in lineage.GRAPH if after[name] != before[name]}
+    assert changed == {"cru_sheets"} | set(lineage.downstream("cru_sheets"))
+    assert "spg_sheets" not in changed
+    label = f"file cru_file={params['cru_file']}"
+    assert lineage.changed_inputs(recorded, "cru_sheets", **params) == [label]
+    row = explained("cru_sheets", **params)
+    assert (row["State"], row["Changed Inputs"]) == ("stale", label)
+
+def test_changed_config_changes_the_version(params, monkeypatch):
+    before = lineage.version("facts", **params)
+    sheets = lineage.version("cru_sheets", **params)
+    lineage.note_built("facts", before, **params)
+    assert explained("facts", **params)["State"] == "fresh"
+
+    monkeypatch.setitem(COUNTRY_NAME_FIXES, "Atlantis", "Lost City")
+    assert lineage.version("facts", **params) != before
+    assert lineage.version("cru_sheets", **params) == sheets
+    row = explained("facts", **params)
+    assert (row["State"], row["Changed Inputs"]) == ("stale", FIXES)
+
+def test_changed_code_changes_the_version_once_reimported(params, tmp_path, monkeypatch):
+    module = tmp_path / "lineage_toy_builder.py"
+    module.write_text("def build(df):\n    return df\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    node = lineage.Node("toy", "Toy artifact", code=("lineage_toy_builder:build",), deps=("cru_sheets",))
+    monkeypatch.setitem(lineage.GRAPH, "toy", node)
+    monkeypatch.setattr(lineage, "NODES", lineage.NODES + [node])
+    monkeypatch.delitem(sys.modules, "lineage_toy_builder", raising=False)
+
+    importlib.import_module("lineage_toy_builder")
+    before = lineage.version("toy", **params)
+    lineage.note_built("toy", before, **params)
+
+    # The running code is what counts: editing the file alone changes nothing
+    module.write_text("def build(df):\n    return df.copy()\n")
+    assert lineage.version("toy", **params) == before
+
+    del sys.modules["lineage_toy_builder"]
+    importlib.invalidate_caches()
+    importlib.import_module("lineage_toy_builder")
+    assert lineage.version("toy", **params) != before
+    row = explained("toy", **params)
+    assert (row["State"], row["Changed Inputs"]) == ("stale", "code lineage_toy_builder:build")
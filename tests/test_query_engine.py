@@ -0,0 +1,68 @@
+# tests/test_query_engine.py
+
+import os
+import shutil
+import zipfile
+
+import duckdb
+import pytest
+
+from modules import lineage
+from modules.query_engine import cache_folder, materialize, query, read_manifest, stale_inputs
+from modules.raw_materials_data_module import BUNDLED_FILE as SPG_FILE
+from modules.rawdata import BUNDLED_FILE as CRU_FILE
+
+REJECTED = [
+    "SELECT 1; SELECT 2",
+    "SELECT count(*) FROM facts; DROP TABLE facts",
+    "COPY facts TO '/tmp/facts.csv'",
+    "ATTACH '/tmp/other.db' AS other",
+    "SET enable_external_access = true",
+    "INSTALL httpfs"
+]
+
+
+@pytest.mark.parametrize("sql", REJECTED)
+def test_only_a_single_select_is_run(sql):
+    with pytest.raises(ValueError, match="single SELECT"):
+        query(sql)
+
+@pytest.mark.parametrize("sql", ["SELECT * FROM read_csv('/etc/passwd')", "SELECT * FROM read_text('/etc/passwd')"])
+def test_selects_cannot_read_files(sql):
+    with pytest.raises(duckdb.PermissionException):
+        query(sql)
+
+def test_tables_stay_queryable():
+    assert query("SELECT count(*) AS n FROM facts")["n"][0] > 0
+    assert not query("SELECT current_setting('enable_external_access') AS on_")["on_"][0]
+
+
+def test_manifest_rebuilds_the_cache_when_a_workbook_changes(tmp_path):
+    cru_file, spg_file = str(tmp_path / "cru.xlsx"), str(tmp_path / "spg.xlsx")
+    shutil.copy(CRU_FILE, cru_file)
+    shutil.copy(SPG_FILE, spg_file)
+    cache_dir = str(tmp_path / "cache")
+    params = {"cru_file": cru_file, "spg_file": spg_file}
+
+    paths = materialize(cru_file, spg_file, cache_dir)
+    folder = cache_folder(cru_file, spg_file, cache_dir)
+    manifest = read_manifest(folder)
+    assert manifest["version"] == lineage.version("parquet_cache", **params)
+    assert sorted(manifest["tables"]) == sorted(paths)
+    assert stale_inputs(cru_file, spg_file, cache_dir) == []
+
+    # Unchanged inputs: the cached files are reused as they are
+    written = os.stat(paths["facts"]).st_mtime_ns
+    assert materialize(cru_file, spg_file, cache_dir) == paths
+    assert os.stat(paths["facts"]).st_mtime_ns == written
+
+    # New bytes in the CRU workbook (an extra archive member the loaders ignore)
+    with zipfile.ZipFile(cru_file, "a") as archive:
+        archive.writestr("customXml/touched.xml", "<touched/>")
+    # The workbook is read upstream of the cache, so it shows as a new export_tables version
+    assert stale_inputs(cru_file, spg_file, cache_dir) == ["node export_tables"]
+
+    materialize(cru_file, spg_file, cache_dir)
+    assert read_manifest(folder)["version"] == lineage.version("parquet_cache", **params) != manifest["version"]
+    assert os.stat(paths["facts"]).st_mtime_ns != written
+    assert stale_inputs(cru_file, spg_file, cache_dir) == []
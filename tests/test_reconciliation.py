@@ -0,0 +1,59 @@
+# tests/test_reconciliation.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.reconciliation import constraint_matrix, group_targets, reconcile
+
+COUNTRIES = ["China", "India", "Japan", "Germany", "Spain"]
+YEARS = [2020, 2021, 2022]
+
+CRU = pd.DataFrame([[100, 110, 120], [20, 25, 30], [10, 10, 10], [5, 5, 0], [0, 0, 0]],
+                   index=COUNTRIES, columns=YEARS, dtype=float)
+SPG = pd.DataFrame([[90, 100, 130], [25, 25, 25], [12, 11, 10], [5, 4, 0], [0, 0, 0]],
+                   index=COUNTRIES, columns=YEARS, dtype=float)
+
+# Overlapping groups, as World + CRU regions + S&P sub-regions
+GROUPS = {
+    "World": COUNTRIES,
+    "Asia": ["China", "India", "Japan"],
+    "Eastern Asia": ["China", "Japan"],
+    "Europe": ["Germany", "Spain"]
+}
+
+
+def assert_meets_targets(house, groups, targets):
+    a = constraint_matrix(house.index, groups)
+    np.testing.assert_allclose(a @ house.to_numpy(), targets.loc[list(groups)].to_numpy(), atol=1e-9)
+
+
+def test_overlapping_group_totals_are_met():
+    targets = group_targets(CRU, SPG, 0.5, GROUPS)
+    # Move the targets off the blend (consistently: Asia + Europe = World)
+    targets.loc["Asia"] += 6.0
+    targets.loc["Eastern Asia"] += 4.0
+    targets.loc["Europe"] += 3.0
+    targets.loc["World"] += 9.0
+    house = reconcile(CRU, SPG, 0.5, GROUPS, targets)
+    assert_meets_targets(house, GROUPS, targets)
+
+def test_targets_from_the_same_tables_leave_the_blend_unchanged():
+    targets = group_targets(CRU, SPG, 0.3, GROUPS)
+    house = reconcile(CRU, SPG, 0.3, GROUPS, targets)
+    pd.testing.assert_frame_equal(house, reconcile(CRU, SPG, 0.3))
+
+def test_all_zero_blend_group_falls_back_to_uniform_weights():
+    # Europe blends to 0 in 2022 but must reach 8: split evenly over its members
+    targets = group_targets(CRU, SPG, 0.5, GROUPS)
+    targets.loc[["Europe", "World"], 2022] += 8.0
+    house = reconcile(CRU, SPG, 0.5, GROUPS, targets)
+    assert_meets_targets(house, GROUPS, targets)
+    assert house.loc["Germany", 2022] == pytest.approx(4.0)
+    assert house.loc["Spain", 2022] == pytest.approx(4.0)
+
+def test_memberless_group_with_a_target_raises():
+    groups = {"World": COUNTRIES, "Africa": ["Atlantis"]}
+    targets = pd.DataFrame([[1.0, 1.0, 1.0]] * 2, index=list(groups), columns=YEARS)
+    with pytest.raises(ValueError, match="Africa"):
+        reconcile(CRU, SPG, 0.5, groups, targets)
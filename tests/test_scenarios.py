@@ -0,0 +1,124 @@
+# tests/test_scenarios.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataset_view import SheetView
+from modules.scenarios import BASE, COUNTRY_COLUMN, Closure, Scale, Scenario, ScenarioEngine, Shift, validate_name
+from modules.sheet_registry import CRU, SPG, year_columns
+
+CRU_YEARS = year_columns(CRU, "P4 Capacity list")
+SPG_YEARS = year_columns(SPG, "P4__AssetList")
+
+
+def asset_view(source, sheet, keys, profiles):
+    """SheetView of an asset list from key rows and {year label: value} builders."""
+    labels = year_columns(source, sheet)
+    df = pd.DataFrame(keys)
+    for label in labels:
+        df[label] = [profile(int(label)) for profile in profiles]
+    return SheetView(df, source, sheet)
+
+def toy_engine():
+    # Two Chinese assets (one from 2020), one in Kazakhstan and the World total row
+    cru = asset_view(CRU, "P4 Capacity list", {
+        "Region": ["Asia", "Asia", "Europe & CIS", "World"],
+        "Country": ["China", "China", "Kazakhstan", None],
+        "Company": ["A", "B", "K", None],
+        "Site": ["S1", "S2", "S3", None],
+        "Product": ["P4"] * 3 + [None],
+        "Status": ["Operating", "Planned", "Operating", None]
+    }, [lambda y: 10.0, lambda y: 5.0 if y >= 2020 else np.nan, lambda y: 20.0, lambda y: 35.0 if y >= 2020 else 30.0])
+    spg = asset_view(SPG, "P4__AssetList", {
+        "Geography": ["China", "Kazakhstan", "India"],
+        "Company": ["A", "K", "I"],
+        "Location": ["L1", "L3", "L4"],
+        "Status": ["Operating", "Operating", "Planned"],
+        "Scenario": ["Base"] * 3
+    }, [lambda y: 12.0, lambda y: 18.0, lambda y: 7.0 if y >= 2025 else np.nan])
+    totals = {
+        CRU: cru.row("Region", "World").astype(float),
+        SPG: pd.Series(50.0, index=[int(y) for y in SPG_YEARS])
+    }
+    return ScenarioEngine({CRU: cru, SPG: spg}, totals)
+
+
+def test_closure_zeroes_matching_assets_from_its_year():
+    engine = toy_engine()
+    scenario = Scenario("Close A", (Closure(CRU, (("Company", "a"),), 2025),))
+    delta = engine.delta(scenario, CRU)
+    assert delta.rows.tolist() == [0]
+    assert delta.values[0].tolist() == [0.0] * 15 + [-10.0] * 5
+    china = engine.country_capacity(CRU, scenario).loc["China"]
+    assert (china[2024], china[2026]) == (15.0, 5.0)
+    assert engine.total(CRU, scenario)[2026] == 25.0
+
+def test_shift_moves_the_profile_and_keeps_missing_years_missing():
+    engine = toy_engine()
+    delayed = Scenario("Delay B", (Shift(CRU, (("Company", "B"),), 2),))
+    assert engine.net_change(CRU, delayed).loc[2019:2022].tolist() == [0.0, -5.0, -5.0, 0.0]
+    assert engine.country_capacity(CRU, delayed).loc["China", [2020, 2022]].tolist() == [10.0, 15.0]
+
+    early = Scenario("Bring India forward", (Shift(SPG, (("Geography", "India"),), -2),))
+    india = engine.country_capacity(SPG, early).loc["India"]
+    assert india[[2023, 2024, 2025]].tolist() == [7.0, 7.0, 7.0]
+    assert np.isnan(india[2020])
+    assert np.isnan(engine.country_capacity(SPG).loc["India", 2023])
+
+def test_scale_applies_to_its_span_only():
+    engine = toy_engine()
+    scenario = Scenario("Halve Kazakhstan", (Scale(SPG, (("Geography", "Kazakhstan"),), 0.5, 2020, 2022),))
+    assert engine.net_change(SPG, scenario).loc[2019:2023].tolist() == [0.0, -9.0, -9.0, -9.0, 0.0]
+    assert engine.total(SPG, scenario)[2021] == 41.0
+
+def test_empty_match_skips_the_world_total_row():
+    engine = toy_engine()
+    assert engine.matching_assets(CRU, ()) == 3
+    closed = Scenario("Close all", (Closure(CRU, (), 2010),))
+    assert engine.net_change(CRU, closed).loc[2019:2020].tolist() == [-30.0, -35.0]
+    assert (engine.total(CRU, closed) == 0).all()
+
+def test_compare_and_country_gaps_match_hand_computed_values():
+    engine = toy_engine()
+    scenario = Scenario("Mixed", (Closure(CRU, (("Company", "A"),), 2021), Scale(SPG, (("Geography", "Kazakhstan"),), 0.5, 2020, 2022)))
+    summary = engine.compare([BASE, scenario], 2021)
+    expected = pd.DataFrame({
+        "Edits": [0, 2],
+        "CRU Capacity": [35.0, 25.0],
+        "S&P Global Capacity": [30.0, 21.0],
+        "Gap (S&P - CRU)": [-5.0, -4.0],
+        "CRU World Total": [35.0, 25.0],
+        "S&P Global KPI": [50.0, 41.0]
+    }, index=pd.Index([BASE.name, "Mixed"], name="Scenario"))
+    pd.testing.assert_frame_equal(summary, expected)
+
+    gaps = engine.country_gaps([BASE, scenario], 2021)
+    assert gaps.loc[["China", "India", "Kazakhstan"]].to_dict() == {
+        BASE.name: {"China": -3.0, "India": 0.0, "Kazakhstan": -2.0},
+        "Mixed": {"China": 7.0, "India": 0.0, "Kazakhstan": -11.0}
+    }
+
+@pytest.mark.parametrize("source", [CRU, SPG])
+def test_closing_every_bundled_asset_removes_exactly_the_base(source):
+    from modules.compare_sources_module import workbook_files
+    from modules.scenario_module import load_scenario_engine
+
+    engine = load_scenario_engine(*workbook_files(), "test")
+    view = engine.assets[source]
+    assets = view.keys[COUNTRY_COLUMN[source]] != None  # noqa: E711
+    base = pd.Series(np.nan_to_num(view.values[assets].astype(np.float64)).sum(axis=0), index=view.years.astype(int))
+
+    closed = Scenario("Close all", (Closure(source, (), int(view.years[0])),))
+    pd.testing.assert_series_equal(engine.net_change(source, closed), -base)
+    published = engine.totals[source].loc[base.index]
+    pd.testing.assert_series_equal(engine.total(source, closed).loc[base.index], published - base)
+    if source == CRU:
+        # The World row is the sum of the assets, so nothing is left
+        assert (engine.total(CRU, closed).abs() < 1e-9).all()
+
+def test_blank_and_base_case_names_are_rejected():
+    for name in ["", "   ", "Base case", " base CASE "]:
+        with pytest.raises(ValueError, match="Base case"):
+            validate_name(name)
+    assert validate_name("  High demand ") == "High demand"
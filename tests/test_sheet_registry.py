@@ -0,0 +1,71 @@
+# tests/test_sheet_registry.py
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from modules.rawdata import load_raw_p4_sheets
+from modules.sheet_registry import CRU, SheetLayoutError, load_error, plan_for
+
+YEARS = list(range(2010, 2030))
+ASSET_KEYS = ["Region", "Country", "Company", "Site", "Product", "Status"]
+
+
+def write_sheet(workbook, name, header_row, header, rows):
+    """Header at 0-based `header_row`, the rows right below it."""
+    sheet = workbook.create_sheet(name)
+    for _ in range(header_row):
+        sheet.append(["Title line"])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+
+@pytest.fixture(scope="module")
+def toy_sheets(tmp_path_factory):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    # Asset list without its Status column
+    keys = [k for k in ASSET_KEYS if k != "Status"]
+    write_sheet(workbook, "P4 Capacity list", 3, keys + YEARS, [["Asia", "China", "A Co", "Site 1", "P4"] + [10] * len(YEARS)])
+    # S&D sheet whose header sits one row lower than registered
+    write_sheet(workbook, "P4 Capacity", 3, [None, None, None] + YEARS, [["Asia", "East Asia", "China"] + [1] * len(YEARS)])
+    # A sheet that matches its layout
+    write_sheet(workbook, "P4 Production", 2, [None, None, None] + YEARS, [["Asia", "East Asia", "China"] + [2] * len(YEARS)])
+    path = tmp_path_factory.mktemp("workbook") / "toy_cru.xlsx"
+    workbook.save(path)
+    return load_raw_p4_sheets(str(path))
+
+
+def test_missing_key_column_names_the_column(toy_sheets):
+    message = load_error(toy_sheets, "P4 Capacity list")
+    assert message.startswith("CRU sheet 'P4 Capacity list' (header row 4)")
+    assert "missing columns ['Status']" in message
+
+def test_shifted_header_row_reports_the_missing_years(toy_sheets):
+    message = load_error(toy_sheets, "P4 Capacity")
+    assert message.startswith("CRU sheet 'P4 Capacity' (header row 3)")
+    assert "missing 20 year columns (2010..2029)" in message
+
+def test_matching_sheet_loads_and_unregistered_ones_are_reported(toy_sheets):
+    df = toy_sheets["P4 Production"]
+    assert isinstance(df, pd.DataFrame)
+    assert list(df.columns[:3]) == ["Region", "Sub-region", "Country"]
+    assert df["2025"].dtype == "float32"
+    assert load_error(toy_sheets, "P4 Demand") == "Sheet 'P4 Demand' not found"
+
+def test_validate_raises_layout_error():
+    plan = plan_for(CRU, "P4 2021 Trade")
+    df = pd.DataFrame(columns=["a", "b", "c", "China"])
+    with pytest.raises(SheetLayoutError, match=r"missing columns \['WorldTotal'\]"):
+        plan.validate(df)
+    with pytest.raises(SheetLayoutError, match="expected at least 3 columns, found 2"):
+        plan.validate(pd.DataFrame(columns=["a", "WorldTotal"]))
+
+def test_compact_drops_only_blank_columns():
+    plan = plan_for(CRU, "P4 2021 Trade")
+    df = pd.DataFrame({
+        "Region": ["Asia"], "Sub-region": ["East Asia"], "Country": ["China"],
+        "Unnamed: 3": ["asset id"], "Unnamed: 4": [None], "Spacer": [float("nan")], "WorldTotal": [None]
+    })
+    compacted = plan.compact(df)
+    assert list(compacted.columns) == ["Region", "Sub-region", "Country", "Unnamed: 3", "WorldTotal"]
@@ -0,0 +1,72 @@
+# tests/test_trade_matrix.py
+
+import numpy as np
+import pandas as pd
+
+from modules.trade_matrix import TradeMatrix, _parse_trade_sheet, build_trade_matrix
+
+# Importers down the rows, exporters across the columns, as in the CRU trade sheets
+TOY_SHEET = pd.DataFrame({
+    "Region": ["Asia", "Asia", "Asia Total", "Europe", "Europe Total", "World Total"],
+    "Sub-region": ["East Asia", "East Asia", None, "West Europe", None, None],
+    "Country": ["China", "Japan", None, "Germany", None, None],
+    "China": [0.0, 30.0, 30.0, 50.0, 50.0, 80.0],
+    "Japan": [5.0, 0.0, 5.0, 10.0, 10.0, 15.0],
+    "Germany": [2.0, 1.0, 3.0, 0.0, 0.0, 3.0],
+    "WorldTotal": [999.0, 999.0, 999.0, 999.0, 999.0, 999.0]
+})
+
+
+def toy_matrix():
+    return build_trade_matrix({"P4 2021 Trade": TOY_SHEET, "P4 2022 Trade": TOY_SHEET.copy()})
+
+
+def test_parse_excludes_subtotals_and_world_total_column():
+    regions, exporters, importers, values = _parse_trade_sheet(TOY_SHEET)
+    assert importers == ["China", "Japan", "Germany"]
+    assert exporters == ["China", "Japan", "Germany"]
+    assert regions == {"China": "Asia", "Japan": "Asia", "Germany": "Europe"}
+    np.testing.assert_array_equal(values, [[0, 5, 2], [30, 0, 1], [50, 10, 0]])
+
+
+def test_flows_are_exporter_by_importer():
+    matrix = toy_matrix()
+    assert isinstance(matrix, TradeMatrix)
+    assert matrix.years == [2021, 2022]
+    flows = matrix.year_slice(2021)
+    china, japan, germany = (matrix.country_index[c] for c in ["China", "Japan", "Germany"])
+    assert flows[china, japan] == 30.0
+    assert flows[japan, china] == 5.0
+    assert flows[china, germany] == 50.0
+    assert flows.sum() == 98.0
+
+
+def test_net_flows_sum_to_zero():
+    net = toy_matrix().net_flows(2021).set_index("Country")
+    assert abs(net["Net"].sum()) < 1e-9
+    assert net.loc["China", "Exports"] == 80.0
+    assert net.loc["China", "Imports"] == 7.0
+    assert net["Exports"].sum() == net["Imports"].sum()
+
+
+def test_region_flows_equal_summed_country_blocks():
+    matrix = toy_matrix()
+    flows = matrix.year_slice(2021)
+    regions = matrix.region_flows(2021)
+    for exporting in matrix.region_names:
+        for importing in matrix.region_names:
+            exp_idx = [matrix.country_index[c] for c in matrix.countries if matrix.regions[c] == exporting]
+            imp_idx = [matrix.country_index[c] for c in matrix.countries if matrix.regions[c] == importing]
+            assert regions.loc[exporting, importing] == flows[np.ix_(exp_idx, imp_idx)].sum()
+    assert regions.loc["Asia", "Europe"] == 60.0
+    assert regions.loc["Europe", "Asia"] == 3.0
+
+
+def test_top_partners():
+    matrix = toy_matrix()
+    exports = matrix.top_partners("China", 2021, n=5)
+    assert exports["Partner"].tolist() == ["Germany", "Japan"]
+    assert exports["Volume"].tolist() == [50.0, 30.0]
+    imports = matrix.top_partners("China", 2021, n=1, direction="imports")
+    assert imports["Partner"].tolist() == ["Japan"]
+    assert matrix.top_partners("Atlantis", 2021).empty